@@ -0,0 +1,81 @@
+import os
+import sys
+import tracemalloc
+from typing import Callable, Dict, List
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from memsim.memory import Memory
+from memsim.os import OS
+from memsim.program import Program
+from memsim.segment import Segment, PROGRAM
+
+CONFIGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "memsim", "configs")
+
+MEMORY_SIZES = [1 << 10, 1 << 14, 1 << 17, 1 << 20]
+# every n-th program is freed after filling the memory, 0 keeps it full
+FRAGMENTATION = {"none": 0, "low": 8, "high": 2}
+# pid of the extra program the benchmarks swap in, filled memories never reach it
+PROBE_PID = 4095
+
+def program_size(memory_size:int) -> int:
+    # keeps the program count (and so the pids) under PROBE_PID at every size
+    return max(16, memory_size // PROBE_PID + 1)
+
+def program_bytes(pid:int, size:int) -> np.ndarray:
+    data = np.full(size, 7, dtype=np.uint16)
+    data[0] = pid
+    return data
+
+def fill_memory(memory:Memory, size:int, free_every:int) -> List[int]:
+    pids = list()
+    for pid, index in enumerate(range(0, memory.memory_size - size + 1, size)):
+        memory.swap_in(Segment(PROGRAM, index, size), program_bytes(pid, size))
+        pids.append(pid)
+    assert len(pids) < PROBE_PID, "the fill would reuse PROBE_PID"
+
+    if free_every:
+        for pid in pids[::free_every]:
+            memory.swap_out(pid)
+
+        pids = [pid for position, pid in enumerate(pids) if position % free_every]
+
+    return pids
+
+def fill_os(os:OS, size:int, free_every:int) -> List[int]:
+    pids = list()
+    # the OS prepends the pid to every program
+    while os.ram.get_total_unallocated_memory() >= size:
+        pids.append(os.load_program(Program(program_bytes(7, size - 1))))
+
+    if free_every:
+        for pid in pids[::free_every]:
+            os.terminate_program(pid)
+
+        pids = [pid for position, pid in enumerate(pids) if position % free_every]
+
+    return pids
+
+def synthetic_config(ram_size:int, programs:int=8, size:int=32) -> Dict:
+    return {
+        "setup": {"ram_size": ram_size, "disc_size": ram_size * 2},
+        "script": {"programs": [{"initialize": {"data": [7] * size}, "timestamps": {}} for _ in range(programs)]},
+    }
+
+@pytest.fixture
+def peak_memory(benchmark) -> Callable:
+    # stores the peak traced allocation of building the benchmark state next
+    # to the timings, so the saved baselines track memory as well
+    def measure(build:Callable):
+        tracemalloc.start()
+        try:
+            state = build()
+            benchmark.extra_info["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return state
+
+    return measure
@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from memsim.memory import Memory
+from memsim.segment import Segment, PROGRAM
+from conftest import MEMORY_SIZES, FRAGMENTATION, PROBE_PID, fill_memory, program_bytes, program_size
+
+@pytest.mark.parametrize("fragmentation", FRAGMENTATION)
+@pytest.mark.parametrize("memory_size", MEMORY_SIZES)
+def test_swap_in_swap_out(benchmark, peak_memory, memory_size, fragmentation):
+    size = program_size(memory_size)
+    memory = peak_memory(lambda: Memory(memory_size))
+    fill_memory(memory, size, FRAGMENTATION[fragmentation])
+    if memory.get_total_unallocated_memory() < size:
+        # a full memory frees its first program so the cycle has a hole
+        memory.swap_out(0)
+
+    data = program_bytes(PROBE_PID, size)
+    programs = len(memory.programs)
+
+    def cycle():
+        block = memory.get_next_free_block(size)
+        memory.swap_in(Segment(PROGRAM, block.index, block.size), data)
+        memory.swap_out(PROBE_PID)
+
+    benchmark(cycle)
+    assert len(memory.programs) == programs and PROBE_PID not in memory.programs
+
+@pytest.mark.parametrize("fragmentation", FRAGMENTATION)
+@pytest.mark.parametrize("memory_size", MEMORY_SIZES)
+def test_grow_shrink(benchmark, memory_size, fragmentation):
+    size = program_size(memory_size)
+    memory = Memory(memory_size)
+    pids = fill_memory(memory, size, FRAGMENTATION[fragmentation])
+    pid = pids[len(pids) // 2]
+    extra = program_bytes(7, 4)
+
+    def cycle():
+        # a full memory has nowhere to grow, only the failed attempt is timed
+        if memory.grow_program(pid, extra):
+            memory.shrink_program(pid, len(extra))
+
+    benchmark(cycle)
+
+@pytest.mark.parametrize("fragmentation", ["low", "high"])
+@pytest.mark.parametrize("memory_size", MEMORY_SIZES)
+def test_compact(benchmark, memory_size, fragmentation):
+    size = program_size(memory_size)
+
+    def setup():
+        memory = Memory(memory_size)
+        fill_memory(memory, size, FRAGMENTATION[fragmentation])
+        return (memory,), {}
+
+    benchmark.pedantic(lambda memory: memory.compact(), setup=setup, rounds=10)
@@ -0,0 +1,24 @@
+import glob
+import os
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from memsim.memsim import MEMSIM
+from memsim.headless import run_headless
+from conftest import CONFIGS_DIR, MEMORY_SIZES, synthetic_config
+
+CONFIGS = sorted(glob.glob(os.path.join(CONFIGS_DIR, "*.json")))
+SCRIPT_TICKS = 200
+
+@pytest.mark.parametrize("config_path", CONFIGS, ids=lambda path: os.path.basename(path)[:-5])
+def test_scripted_run(benchmark, config_path):
+    # replays the script from a fresh simulation every round, failures are
+    # part of what some configs test and end the run as in the headless mode
+    result = benchmark(run_headless, config_path, SCRIPT_TICKS)
+    benchmark.extra_info["error"] = result["error"]
+
+@pytest.mark.parametrize("memory_size", MEMORY_SIZES)
+def test_auto_step(benchmark, peak_memory, memory_size):
+    memsim = peak_memory(lambda: MEMSIM(synthetic_config(memory_size), auto_mode=True, seed=0))
+    benchmark(memsim.step)
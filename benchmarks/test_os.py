@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from memsim.os import OS
+from memsim.program import Program
+from conftest import MEMORY_SIZES, FRAGMENTATION, fill_os, program_bytes, program_size
+
+def fragmented_os(memory_size:int, fragmentation:str):
+    os = OS(memory_size, memory_size)
+    pids = fill_os(os, program_size(memory_size), FRAGMENTATION[fragmentation])
+    if os.ram.get_total_unallocated_memory() < program_size(memory_size):
+        # a full RAM frees its first program so every operation has room
+        os.terminate_program(pids.pop(0))
+
+    return os, pids
+
+@pytest.mark.parametrize("fragmentation", FRAGMENTATION)
+@pytest.mark.parametrize("memory_size", MEMORY_SIZES)
+def test_load_terminate(benchmark, peak_memory, memory_size, fragmentation):
+    os, _ = peak_memory(lambda: fragmented_os(memory_size, fragmentation))
+    program = Program(program_bytes(7, program_size(memory_size) - 1))
+
+    def cycle():
+        # also covers _search_lowest_id, the pid is acquired and released
+        os.terminate_program(os.load_program(program))
+
+    benchmark(cycle)
+
+@pytest.mark.parametrize("fragmentation", FRAGMENTATION)
+@pytest.mark.parametrize("memory_size", MEMORY_SIZES)
+def test_add_pop_bytes(benchmark, memory_size, fragmentation):
+    os, pids = fragmented_os(memory_size, fragmentation)
+    pid = pids[len(pids) // 2]
+    extra = program_bytes(7, 4)
+
+    def cycle():
+        os.add_bytes_program(pid, extra)
+        os.pop_bytes_program(pid, len(extra))
+
+    benchmark(cycle)
+
+@pytest.mark.parametrize("fragmentation", ["low", "high"])
+@pytest.mark.parametrize("memory_size", MEMORY_SIZES)
+def test_shrink_ram(benchmark, memory_size, fragmentation):
+    def setup():
+        os, _ = fragmented_os(memory_size, fragmentation)
+        return (os,), {}
+
+    benchmark.pedantic(lambda os: os.shrink_ram(), setup=setup, rounds=10)
@@ -0,0 +1,70 @@
+import numpy as np
+from numpy.typing import NDArray
+
+class AccessTracker:
+    """
+    Per-program recency kept in flat numpy arrays indexed by pid (pids are
+    dense, the IDAllocator always hands out the lowest free one), so eviction
+    policies can rank all RAM programs with a single vectorized lookup.
+    """
+
+    def __init__(self, capacity:int=64):
+        self.capacity = 0
+        # tick of the last insert, pop or read, -1 when never touched
+        self.last_touch:NDArray = np.empty(0, dtype=np.int64)
+        # monotonic sequence numbers, they order events inside the same tick
+        self.touched_seq:NDArray = np.empty(0, dtype=np.int64)
+        self.grown_seq:NDArray = np.empty(0, dtype=np.int64)
+        self.loaded_seq:NDArray = np.empty(0, dtype=np.int64)
+        # Clock reference bit, set on every touch and cleared by the hand
+        self.referenced:NDArray = np.empty(0, dtype=np.bool_)
+        self.seq = 0
+        self._ensure(capacity - 1)
+
+    def _ensure(self, pid:int):
+        if pid < self.capacity:
+            return
+
+        capacity = max(pid + 1, self.capacity * 2)
+        extra = capacity - self.capacity
+        self.last_touch = np.concatenate((self.last_touch, np.full(extra, -1, dtype=np.int64)))
+        self.touched_seq = np.concatenate((self.touched_seq, np.full(extra, -1, dtype=np.int64)))
+        self.grown_seq = np.concatenate((self.grown_seq, np.full(extra, -1, dtype=np.int64)))
+        self.loaded_seq = np.concatenate((self.loaded_seq, np.full(extra, -1, dtype=np.int64)))
+        self.referenced = np.concatenate((self.referenced, np.zeros(extra, dtype=np.bool_)))
+        self.capacity = capacity
+
+    def _next_seq(self) -> int:
+        self.seq += 1
+        return self.seq
+
+    def touch(self, pid:int, tick:int):
+        self._ensure(pid)
+        self.last_touch[pid] = tick
+        self.touched_seq[pid] = self._next_seq()
+        self.referenced[pid] = True
+
+    def grown(self, pid:int):
+        self._ensure(pid)
+        self.grown_seq[pid] = self._next_seq()
+
+    def loaded(self, pid:int):
+        # entering RAM counts as a touch for LRU and Clock as well
+        self._ensure(pid)
+        self.loaded_seq[pid] = self.touched_seq[pid] = self._next_seq()
+        self.referenced[pid] = True
+
+    def forget(self, pid:int):
+        if pid >= self.capacity:
+            return
+
+        self.last_touch[pid] = self.touched_seq[pid] = self.grown_seq[pid] = self.loaded_seq[pid] = -1
+        self.referenced[pid] = False
+
+    def clear(self):
+        self.last_touch.fill(-1)
+        self.touched_seq.fill(-1)
+        self.grown_seq.fill(-1)
+        self.loaded_seq.fill(-1)
+        self.referenced.fill(False)
+        self.seq = 0
@@ -17,6 +17,16 @@ class Byte:
             return cls.MAX
         return value
 
+    @classmethod
+    def to_array(cls, values) -> np.ndarray:
+        if isinstance(values, np.ndarray) and values.dtype == cls.dtype:
+            return values
+
+        if not isinstance(values, np.ndarray):
+            values = [int(v, 16) if isinstance(v, str) else int(v) for v in values]
+
+        return np.clip(np.asarray(values, dtype=np.int64), cls.MIN, cls.MAX).astype(cls.dtype)
+
     @property
     def value(self) -> int:
         return int(self._value)
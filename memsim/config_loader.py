@@ -0,0 +1,85 @@
+import json
+from typing import Any, Dict, Iterator, List, Tuple
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# line-delimited scripts: a setup line, one line per program, then the events
+# sorted by tick, e.g.
+#   {"setup": {"ram_size": 1024, "disc_size": 4096}}
+#   {"program": 0, "initialize": {"data": [10, 20, 30]}}
+#   {"tick": 10, "program": 0, "insert": [40, 50]}
+EVENT_STREAM_EXTENSIONS = (".jsonl", ".ndjson")
+
+ProgramEntry = Tuple[List[Any], Dict[str, Dict[str, Any]]|None]
+Event = Tuple[int, int, str, Any]
+
+class ConfigSource:
+    """
+    Reads a configuration without keeping the script around: programs come
+    one at a time and, for line-delimited scripts, the events are a lazy
+    iterator that the EventScheduler pulls in tick order.
+    """
+
+    def __init__(self, config:str|Dict):
+        self.streamed = isinstance(config, str) and config.endswith(EVENT_STREAM_EXTENSIONS)
+        if isinstance(config, str) and not self.streamed and ijson is None:
+            # without ijson the file is parsed once and read as a dict
+            with open(config, "r") as config_file:
+                config = json.load(config_file)
+
+        self.config = config
+        self.setup = self._read_setup()
+
+    def _read_setup(self) -> Dict:
+        if isinstance(self.config, dict):
+            return self.config["setup"]
+
+        if self.streamed:
+            with open(self.config, "r") as config_file:
+                return json.loads(config_file.readline())["setup"]
+
+        # ijson reads bytes, it stops as soon as the setup object is complete
+        with open(self.config, "rb") as config_file:
+            return next(ijson.items(config_file, "setup", use_float=True))
+
+    def programs(self) -> Iterator[ProgramEntry]:
+        # (initial bytes, timestamps) of every program in config order, the
+        # timestamps are None for line-delimited scripts
+        if isinstance(self.config, dict):
+            for program in self.config["script"]["programs"]:
+                yield program["initialize"]["data"], program.get("timestamps")
+            return
+
+        if self.streamed:
+            with open(self.config, "r") as config_file:
+                config_file.readline()
+                for line in config_file:
+                    entry = json.loads(line)
+                    if "tick" in entry:
+                        return
+                    yield entry["initialize"]["data"], None
+            return
+
+        with open(self.config, "rb") as config_file:
+            for program in ijson.items(config_file, "script.programs.item", use_float=True):
+                yield program["initialize"]["data"], program.get("timestamps")
+
+    def events(self, pids:List[int]) -> Iterator[Event]:
+        # (tick, pid, command, param) of a line-delimited script, the program
+        # index of every event is translated to the pid it was loaded with
+        if not self.streamed:
+            return
+
+        with open(self.config, "r") as config_file:
+            for line in config_file:
+                entry = json.loads(line)
+                if "tick" not in entry:
+                    continue
+
+                tick = entry.pop("tick")
+                program = entry.pop("program")
+                command, param = next(iter(entry.items()))
+                yield int(tick), pids[program], command, param
@@ -1,26 +1,81 @@
+import os
+import tempfile
+import weakref
+import numpy as np
+from numpy.typing import NDArray
 from .byte import Byte, NULL
 from .memory import Memory
 from .program import Program
 from .segment import Segment, PROGRAM, HOLE
+from .layout_events import SPLIT, RESIZE
+
+def _remove_backing(path:str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
 
 class Disc(Memory):
-    def __init__(self, size:Byte.dtype=Byte.MAX * 2):
-        super().__init__(size)
+    def __init__(self, size:Byte.dtype=Byte.MAX * 2, lazy_clear:bool=False, backing_dir:str|None=None):
+        # with a backing_dir the cells live in a memory-mapped file instead
+        # of process memory, so swap traffic goes through the page cache. Every
+        # Disc creates its own file there, removed once the Disc is closed or
+        # collected, so simulations sharing a directory never touch each other
+        self.backing_path = None
+        if backing_dir is not None:
+            os.makedirs(backing_dir, exist_ok=True)
+            handle, self.backing_path = tempfile.mkstemp(prefix="memsim-disc-", suffix=".bin", dir=backing_dir)
+            os.close(handle)
+            self._backing_finalizer = weakref.finalize(self, _remove_backing, self.backing_path)
+
+        super().__init__(size, lazy_clear=lazy_clear)
+        # memory_size grows with expand_disc, this is the size asked for
+        self.initial_size = self.memory_size
+
+    def _allocate_memory(self, size:int) -> NDArray:
+        if self.backing_path is None:
+            return super()._allocate_memory(size)
+
+        return np.memmap(self.backing_path, dtype=Byte.dtype, mode="w+", shape=(size,))
 
     def expand_disc(self, size:int):
-        self.main_memory += [NULL] * size
-        further_most_segment = self.memory_layout[len(self.memory_layout)-1]
+        if self.backing_path is None:
+            self.main_memory = np.concatenate((self.main_memory, np.full(size, NULL.value, dtype=Byte.dtype)))
+        else:
+            # grows the file itself, the new tail reads as zeros
+            self.main_memory.flush()
+            del self.main_memory
+            with open(self.backing_path, "r+b") as backing_file:
+                backing_file.truncate((self.memory_size + size) * np.dtype(Byte.dtype).itemsize)
+            self.main_memory = np.memmap(self.backing_path, dtype=Byte.dtype, mode="r+", shape=(self.memory_size + size,))
+
+        self.memory_size += size
+
+        last_position = len(self.memory_layout)-1
+        further_most_segment = self.memory_layout[last_position]
         if further_most_segment.type == HOLE:
+            self._remove_hole(further_most_segment)
             further_most_segment.size += size
+            self._add_hole(further_most_segment)
+            if self.layout_listeners:
+                self._emit(RESIZE, last_position, 1, 1)
         else:
-            self.memory_layout.append(Segment(
+            new_hole = Segment(
                 HOLE,
                 further_most_segment.index + further_most_segment.size,
                 size
-            ))
-
-
-    
+            )
+            self.memory_layout.append(new_hole)
+            self._add_hole(new_hole)
+            if self.layout_listeners:
+                self._emit(SPLIT, last_position + 1, 0, 1)
 
+    def close(self):
+        # drops the map without reading it back and deletes the file, the
+        # Disc holds no cells afterwards and can't be used anymore
+        if self.backing_path is None:
+            return
 
-        
\ No newline at end of file
+        self.main_memory = np.zeros(0, dtype=Byte.dtype)
+        self.backing_path = None
+        self._backing_finalizer()
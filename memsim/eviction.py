@@ -0,0 +1,109 @@
+from typing import Dict, Optional, Type
+import numpy as np
+from numpy.typing import NDArray
+from .segment import PROGRAM
+
+LARGEST_FIRST = "largest_first"
+LEAST_RECENTLY_GROWN = "least_recently_grown"
+LRU = "lru"
+CLOCK = "clock"
+FIFO = "fifo"
+
+class EvictionPolicy:
+    """
+    Picks which RAM program is swapped out to the Disc when a load doesn't fit
+    even after compaction.
+    """
+    name = None
+
+    def select(self, os) -> Optional[int]:
+        raise NotImplementedError
+
+def _oldest(os, sequence:NDArray) -> Optional[int]:
+    # RAM program with the smallest sequence number, ties go to the lowest pid
+    if not os.ram.programs:
+        return None
+
+    pids = np.fromiter(os.ram.programs, dtype=np.int64, count=len(os.ram.programs))
+    pids.sort()
+    return int(pids[np.argmin(sequence[pids])])
+
+class LargestFirst(EvictionPolicy):
+    name = LARGEST_FIRST
+
+    def select(self, os) -> Optional[int]:
+        programs = os.ram.programs
+        if not programs:
+            return None
+
+        return max(programs, key=lambda pid: (programs[pid].size, -pid))
+
+class LeastRecentlyGrown(EvictionPolicy):
+    name = LEAST_RECENTLY_GROWN
+
+    def select(self, os) -> Optional[int]:
+        # programs that never grew go first
+        return _oldest(os, os.tracker.grown_seq)
+
+class LeastRecentlyUsed(EvictionPolicy):
+    name = LRU
+
+    def select(self, os) -> Optional[int]:
+        return _oldest(os, os.tracker.touched_seq)
+
+class FirstInFirstOut(EvictionPolicy):
+    name = FIFO
+
+    def select(self, os) -> Optional[int]:
+        # the program loaded into RAM the longest time ago
+        return _oldest(os, os.tracker.loaded_seq)
+
+class Clock(EvictionPolicy):
+    """
+    Second chance: a hand sweeps the RAM by address, programs touched since
+    the last sweep lose their reference bit and are skipped, the first one
+    without it is the victim.
+    """
+    name = CLOCK
+
+    def __init__(self):
+        self.hand = 0
+
+    def select(self, os) -> Optional[int]:
+        ram = os.ram
+        if not ram.programs:
+            return None
+
+        layout = ram.memory_layout
+        referenced = os.tracker.referenced
+        count = len(layout)
+        start = max(ram._layout_position(self.hand), 0)
+
+        # after one full turn every bit is clear, so two turns always end
+        for step in range(2 * count + 1):
+            segment = layout[(start + step) % count]
+            if segment.type != PROGRAM:
+                continue
+
+            pid = ram.get_program_id(segment)
+            if referenced[pid]:
+                referenced[pid] = False
+                continue
+
+            self.hand = segment.index + segment.size
+            return pid
+
+        return None
+
+EVICTION_POLICIES:Dict[str, Type[EvictionPolicy]] = {
+    policy.name: policy for policy in (LargestFirst, LeastRecentlyGrown, LeastRecentlyUsed, Clock, FirstInFirstOut)
+}
+
+def create_eviction(name:str|None) -> EvictionPolicy|None:
+    if name is None:
+        return None
+
+    if name not in EVICTION_POLICIES:
+        raise ValueError(f"Unknown eviction policy: {name}, expected one of {', '.join(EVICTION_POLICIES)}")
+
+    return EVICTION_POLICIES[name]()
@@ -0,0 +1,143 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterator, List, Optional, Tuple
+
+# holes per chunk before it is split in two
+CHUNK_SIZE = 256
+
+class FreeSpaceIndex:
+    """
+    Address-ordered index of the HOLEs, split in chunks of at most
+    2 * CHUNK_SIZE holes that remember their biggest hole. First-fit lookups
+    skip every chunk without a big enough hole and only scan the one that has
+    it, and the memory used grows with the number of holes, not of cells.
+    """
+
+    def __init__(self):
+        self.addresses:List[array] = list()
+        self.sizes:List[array] = list()
+        # first address and biggest hole of every chunk
+        self.firsts:List[int] = list()
+        self.maxima:List[int] = list()
+        self.count = 0
+        self._largest:int|None = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _chunk(self, address:int) -> int:
+        return max(bisect_right(self.firsts, address) - 1, 0)
+
+    def _shrunk(self, chunk:int, size:int):
+        # a hole of size left the chunk, its maximum may have to be rescanned
+        if size < self.maxima[chunk]:
+            return
+
+        if self._largest == self.maxima[chunk]:
+            self._largest = None
+
+        self.maxima[chunk] = max(self.sizes[chunk])
+
+    def holes(self) -> Iterator[Tuple[int, int]]:
+        for addresses, sizes in zip(self.addresses, self.sizes):
+            yield from zip(addresses, sizes)
+
+    def set(self, address:int, size:int):
+        if size <= 0:
+            self.clear(address)
+            return
+
+        if self._largest is not None and size > self._largest:
+            self._largest = size
+
+        if not self.addresses:
+            self.addresses.append(array("q", [address]))
+            self.sizes.append(array("q", [size]))
+            self.firsts.append(address)
+            self.maxima.append(size)
+            self.count += 1
+            return
+
+        chunk = self._chunk(address)
+        addresses = self.addresses[chunk]
+        sizes = self.sizes[chunk]
+        position = bisect_left(addresses, address)
+
+        if position < len(addresses) and addresses[position] == address:
+            previous = sizes[position]
+            sizes[position] = size
+            if size >= self.maxima[chunk]:
+                self.maxima[chunk] = size
+            else:
+                self._shrunk(chunk, previous)
+            return
+
+        addresses.insert(position, address)
+        sizes.insert(position, size)
+        self.firsts[chunk] = addresses[0]
+        self.maxima[chunk] = max(self.maxima[chunk], size)
+        self.count += 1
+
+        if len(addresses) > 2 * CHUNK_SIZE:
+            self.addresses.insert(chunk + 1, addresses[CHUNK_SIZE:])
+            self.sizes.insert(chunk + 1, sizes[CHUNK_SIZE:])
+            del addresses[CHUNK_SIZE:]
+            del sizes[CHUNK_SIZE:]
+            self.firsts.insert(chunk + 1, self.addresses[chunk + 1][0])
+            self.maxima.insert(chunk + 1, max(self.sizes[chunk + 1]))
+            self.maxima[chunk] = max(sizes)
+
+    def clear(self, address:int):
+        if not self.addresses:
+            return
+
+        chunk = self._chunk(address)
+        addresses = self.addresses[chunk]
+        sizes = self.sizes[chunk]
+        position = bisect_left(addresses, address)
+        if position == len(addresses) or addresses[position] != address:
+            return
+
+        size = sizes[position]
+        del addresses[position]
+        del sizes[position]
+        self.count -= 1
+
+        if not addresses:
+            del self.addresses[chunk]
+            del self.sizes[chunk]
+            del self.firsts[chunk]
+            maximum = self.maxima.pop(chunk)
+            if self._largest == maximum:
+                self._largest = None
+            return
+
+        self.firsts[chunk] = addresses[0]
+        self._shrunk(chunk, size)
+
+    def largest(self) -> int:
+        if self._largest is None:
+            self._largest = max(self.maxima, default=0)
+
+        return self._largest
+
+    def first_fit(self, size:int, start:int=0) -> Optional[int]:
+        # leftmost hole starting at or after start with at least size cells
+        size = max(size, 1)
+        if self.largest() < size:
+            return None
+
+        chunk = self._chunk(start) if start > 0 else 0
+        position = bisect_left(self.addresses[chunk], start)
+
+        maxima = self.maxima
+        for chunk in range(chunk, len(maxima)):
+            if maxima[chunk] >= size:
+                sizes = self.sizes[chunk]
+                for position in range(position, len(sizes)):
+                    if sizes[position] >= size:
+                        return self.addresses[chunk][position]
+
+            position = 0
+
+        return None
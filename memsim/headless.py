@@ -0,0 +1,116 @@
+import argparse
+import json
+import time
+from typing import Dict, List
+from .memsim import MEMSIM
+from .memory_errors import MemSimError
+
+STATS_KEYS = (
+    "config", "auto", "seed", "ticks", "elapsed", "ticks_per_second", "allocations", "swaps", "compactions",
+    "relocations", "evictions", "disc_expansions", "programs", "allocated_memory", "placement", "eviction",
+    "ram_size", "disc_size", "final_disc_size", "fragmentation", "compaction_frequency", "error", "profile",
+)
+
+def failure_stats(config_path:str|Dict, auto_mode:bool, seed:int|None, error:Exception) -> Dict:
+    # a config that can't even load its programs is reported like any other
+    # failed run, the stats that need a simulation are None
+    result = dict.fromkeys(STATS_KEYS)
+    result.update({
+        "config": config_path if isinstance(config_path, str) else None,
+        "auto": auto_mode,
+        "seed": seed,
+        "ticks": 0,
+        "elapsed": 0.0,
+        "ticks_per_second": 0.0,
+        "error": type(error).__name__,
+    })
+    return result
+
+def run_headless(config_path:str|Dict, ticks:int, auto_mode:bool=False, skip_idle:bool=False, seed:int|None=None,
+                 metrics_path:str|None=None, profile:bool=False) -> Dict:
+    try:
+        memsim = MEMSIM(config_path, auto_mode=auto_mode, seed=seed)
+    except (MemSimError, ValueError) as e:
+        return failure_stats(config_path, auto_mode, seed, e)
+
+    try:
+        return _run(memsim, config_path, ticks, auto_mode, skip_idle, metrics_path, profile)
+    finally:
+        memsim.os.disc.close()
+
+def _run(memsim:MEMSIM, config_path:str|Dict, ticks:int, auto_mode:bool, skip_idle:bool, metrics_path:str|None,
+         profile:bool) -> Dict:
+    if metrics_path is not None and memsim.metrics is None:
+        memsim.enable_metrics()
+    if profile and memsim.profiler is None:
+        memsim.enable_profiling()
+    error = None
+
+    start = time.perf_counter()
+    try:
+        while memsim.dt < ticks:
+            if skip_idle:
+                memsim.skip_to_next_event(ticks)
+            else:
+                memsim.step()
+    except MemSimError as e:
+        error = type(e).__name__
+    elapsed = time.perf_counter() - start
+
+    if metrics_path is not None:
+        memsim.metrics.export(metrics_path)
+
+    ram = memsim.os.ram
+    stats = ram.get_stats()
+    return {
+        "config": config_path if isinstance(config_path, str) else None,
+        "auto": auto_mode,
+        "seed": memsim.seed,
+        "ticks": memsim.dt,
+        "elapsed": elapsed,
+        "ticks_per_second": memsim.dt / elapsed if elapsed > 0 else 0.0,
+        "allocations": memsim.os.allocations,
+        "swaps": memsim.os.swaps,
+        "compactions": memsim.os.compactions,
+        "relocations": memsim.os.relocations,
+        "evictions": memsim.os.evictions,
+        "disc_expansions": memsim.os.disc_expansions,
+        "programs": stats.programs,
+        "allocated_memory": stats.allocated,
+        "placement": ram.placement.name,
+        "eviction": memsim.os.eviction.name if memsim.os.eviction else None,
+        "ram_size": stats.memory_size,
+        "disc_size": memsim.os.disc.initial_size,
+        "final_disc_size": memsim.os.disc.memory_size,
+        "fragmentation": stats.fragmentation,
+        "compaction_frequency": memsim.metrics.compaction_frequency() if memsim.metrics else None,
+        "error": error,
+        "profile": memsim.profiler.summary() if memsim.profiler else None,
+    }
+
+def _metrics_path(path:str|None, position:int, count:int) -> str|None:
+    if path is None or count == 1:
+        return path
+
+    stem, dot, extension = path.rpartition(".")
+    return f"{stem}_{position}.{extension}" if dot else f"{path}_{position}"
+
+def main(argv:List[str]|None=None):
+    parser = argparse.ArgumentParser(prog="python -m memsim.headless", description="Runs MEMSIM without the UI and prints the final stats as JSON")
+    parser.add_argument("configs", nargs="+", help="configuration files, e.g. memsim/configs/teste_completo.json")
+    parser.add_argument("-t", "--ticks", type=int, default=1000, help="number of ticks to run (default: 1000)")
+    parser.add_argument("-a", "--auto", action="store_true", help="run in automatic mode instead of following the script")
+    parser.add_argument("-s", "--skip-idle", action="store_true", help="jump over ticks that have no scheduled events")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the automatic mode generator")
+    parser.add_argument("-m", "--metrics", default=None, help="writes the per-tick metrics to this .csv or .npz file (one file per config, suffixed by its position)")
+    parser.add_argument("-P", "--profile", action="store_true", help="adds per-operation call counts and latency percentiles to the stats")
+    args = parser.parse_args(argv)
+
+    stats = [
+        run_headless(config_path, args.ticks, args.auto, args.skip_idle, args.seed, _metrics_path(args.metrics, position, len(args.configs)), args.profile)
+        for position, config_path in enumerate(args.configs)
+    ]
+    print(json.dumps(stats if len(stats) > 1 else stats[0], indent=4))
+
+if __name__ == "__main__":
+    main()
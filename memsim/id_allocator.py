@@ -0,0 +1,27 @@
+import heapq
+from typing import List
+
+class IDAllocator:
+    """
+    Hands out the lowest free pid: released ids are kept in a min-heap and
+    fresh ids come from a high-water mark, so every call is O(log n).
+    """
+
+    def __init__(self):
+        self.released:List[int] = list()
+        self.next_id = 0
+
+    def acquire(self) -> int:
+        if self.released:
+            return heapq.heappop(self.released)
+
+        pid = self.next_id
+        self.next_id += 1
+        return pid
+
+    def release(self, pid:int):
+        heapq.heappush(self.released, pid)
+
+    def clear(self):
+        self.released.clear()
+        self.next_id = 0
@@ -0,0 +1,27 @@
+from typing import Callable, List
+from .segment import Segment
+
+SPLIT = "split"
+MERGE = "merge"
+RESIZE = "resize"
+MOVE = "move"
+
+class LayoutChange:
+    """
+    A splice of memory_layout: the removed segments starting at position were
+    replaced by segments (copies taken when the change happened). pids holds
+    the pid of every PROGRAM in segments and None for holes, so listeners
+    never have to read the memory back.
+    """
+
+    def __init__(self, kind:str, position:int, removed:int, segments:List[Segment], pids:List[int|None]):
+        self.kind = kind
+        self.position = position
+        self.removed = removed
+        self.segments = segments
+        self.pids = pids
+
+    def __repr__(self):
+        return f"LayoutChange({self.kind}, {self.position}, -{self.removed}, +{len(self.segments)})"
+
+LayoutListener = Callable[[LayoutChange], None]
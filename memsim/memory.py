@@ -1,21 +1,127 @@
+import numpy as np
+from numpy.typing import NDArray
 from .byte import Byte, NULL
 from .safe_list import SafeList
-from typing import List, Tuple, Generator
+from typing import Dict, List, Tuple, Generator
 from .memory_errors import MSNotEnoughMemory, MSFaultyAccess, MSNoAllocationBlockAvailable, MSIDNotFound
 from .segment import Segment, PROGRAM, HOLE
 from .program import Program
+from .free_space import FreeSpaceIndex
+from .placement import PlacementPolicy, FirstFit
+from .layout_events import LayoutChange, LayoutListener, SPLIT, MERGE, RESIZE, MOVE
+from bisect import bisect_right
+
+class MemoryStats:
+    """Point-in-time counters of a Memory, cheap enough to take every tick."""
+
+    def __init__(self, memory_size:int, allocated:int, programs:int, holes:int, largest_hole:int):
+        self.memory_size = memory_size
+        self.allocated = allocated
+        self.unallocated = memory_size - allocated
+        self.programs = programs
+        self.holes = holes
+        self.largest_hole = largest_hole
+        # external fragmentation: 1 - largest hole / total free memory
+        self.fragmentation = 1.0 - largest_hole / self.unallocated if self.unallocated else 0.0
+
+    def __repr__(self):
+        return (f"MemoryStats(allocated={self.allocated}/{self.memory_size}, programs={self.programs}, "
+                f"holes={self.holes}, largest_hole={self.largest_hole})")
 
 class Memory:
-    def __init__(self, memory_size:int=Byte.MAX+1):
+    def __init__(self, memory_size:int=Byte.MAX+1, placement:PlacementPolicy|None=None, lazy_clear:bool=False):
         if memory_size > 0:
             self.memory_size = memory_size
         else:
             self.memory_size = Byte.MAX + 1
 
-        self.main_memory = SafeList([NULL for _ in range(self.memory_size)])
+        self.main_memory = self._allocate_memory(self.memory_size)
+
+        # lazy_clear leaves freed cells dirty, they only read as NULL once
+        # get_bytes cleans them; the eager mode zeroes on every free
+        self.lazy_clear = lazy_clear
+        self._dirty = False
         self.memory_layout = SafeList([Segment(HOLE, 0, self.memory_size)])
 
-    def swap_in(self, block:Segment, program_bytes:list[Byte]):
+        self.placement = placement or FirstFit()
+        self.placement.attach(self)
+
+        # running totals, every hole change goes through _add_hole/_remove_hole
+        self.free_memory = 0
+        self.hole_count = 0
+        # hole_histogram[k] counts the holes with 2**k <= size < 2**(k+1)
+        self.hole_histogram:List[int] = [0] * self.memory_size.bit_length()
+
+        self.free_space = FreeSpaceIndex()
+        self._add_hole(self.memory_layout[0])
+
+        # pid -> live PROGRAM segment of memory_layout, segments are mutated in
+        # place so the entries stay valid across splits, merges and moves
+        self.programs:Dict[int, Segment] = dict()
+
+        # notified of every memory_layout splice, see add_layout_listener
+        self.layout_listeners:List[LayoutListener] = list()
+
+    def _layout_position(self, index:int) -> int:
+        # memory_layout is always sorted by address, so the segment containing
+        # an address is found by bisection instead of a linear walk
+        return bisect_right(self.memory_layout, index, key=lambda segment: segment.index) - 1
+
+    def _allocate_memory(self, size:int) -> NDArray:
+        return np.zeros(size, dtype=Byte.dtype)
+
+    def _clear(self, start:int, end:int):
+        if self.lazy_clear:
+            self._dirty = True
+        else:
+            self.main_memory[start:end] = NULL.value
+
+    def _clean(self):
+        for segment in self.memory_layout:
+            if segment.type == HOLE:
+                self.main_memory[segment.index:segment.index+segment.size] = NULL.value
+            elif segment.used < segment.size:
+                self.main_memory[segment.index+segment.used:segment.index+segment.size] = NULL.value
+
+        self._dirty = False
+
+    def add_layout_listener(self, listener:LayoutListener):
+        self.layout_listeners.append(listener)
+
+    def remove_layout_listener(self, listener:LayoutListener):
+        if listener in self.layout_listeners:
+            self.layout_listeners.remove(listener)
+
+    def _emit(self, kind:str, position:int, removed:int, inserted:int):
+        # the inserted segments are already in memory_layout at position
+        segments = [segment.copy() for segment in self.memory_layout[position:position+inserted]]
+        pids = [self.get_program_id(segment) if segment.type == PROGRAM else None for segment in segments]
+        change = LayoutChange(kind, position, removed, segments, pids)
+
+        for listener in self.layout_listeners:
+            listener(change)
+
+    def _add_hole(self, segment:Segment):
+        self.free_space.set(segment.index, segment.size)
+        self.placement.hole_added(segment.index, segment.size)
+        self.free_memory += segment.size
+        self.hole_count += 1
+
+        bucket = max(segment.size.bit_length() - 1, 0)
+        if bucket >= len(self.hole_histogram):
+            # only a growing Disc gets holes past its initial size
+            self.hole_histogram.extend([0] * (bucket + 1 - len(self.hole_histogram)))
+        self.hole_histogram[bucket] += 1
+
+    def _remove_hole(self, segment:Segment):
+        self.free_space.clear(segment.index)
+        self.placement.hole_removed(segment.index, segment.size)
+        self.free_memory -= segment.size
+        self.hole_count -= 1
+        self.hole_histogram[max(segment.size.bit_length() - 1, 0)] -= 1
+
+    def swap_in(self, block:Segment, program_bytes:list[Byte]|NDArray):
+        program_bytes = Byte.to_array(program_bytes)
         block_end = block.index + block.size
         index = block.index
         size = block.size
@@ -23,95 +129,389 @@ class Memory:
         if size < len(program_bytes):
             raise MSNotEnoughMemory(self.main_memory, self.memory_layout, size)
 
-        for other_programs in self.memory_layout:
-            if other_programs.type == PROGRAM:
-                other_program_start = other_programs.index
-                other_program_end = other_programs.index + other_programs.size
-
-                if other_program_start < index < other_program_end or other_program_start < block_end < other_program_end:
-                    raise MSFaultyAccess(self.main_memory, self.memory_layout, Segment(PROGRAM, index, size))
-                elif index < other_program_start < block_end or index < other_program_end < block_end:
-                    raise MSFaultyAccess(self.main_memory, self.memory_layout, Segment(PROGRAM, index, size))
-        
-        next_layout_index = 0
-        hole_before = True
-        hole_after = True
-        segment = None
-        for next_layout_index, segment in enumerate(self.memory_layout):
-            segment_end = segment.index + segment.size
-            if segment.type == HOLE and segment.index <= index <= segment_end and segment.index <= block_end <= segment_end:
-                    if segment.index == index:
-                        hole_before = False
-
-                    if segment_end == block_end:
-                        hole_after = False
-
-                    break
-        else:
+        if index < 0 or block_end > self.memory_size:
             raise MSNoAllocationBlockAvailable(self.main_memory, self.memory_layout, Segment(PROGRAM, index, size))
-        
-        if hole_after:
-            self.memory_layout.insert(next_layout_index+1, Segment(HOLE, index+size, (segment.index + segment.size) - (index+size)))
 
-        if hole_before:
-            self.memory_layout.insert(next_layout_index, Segment(HOLE, segment.index, index - segment.index))
+        layout_index = self._layout_position(index)
+        segment = self.memory_layout[layout_index]
+        segment_end = segment.index + segment.size
+        layout_count = len(self.memory_layout)
+
+        if segment.type != HOLE or block_end > segment_end:
+            raise MSFaultyAccess(self.main_memory, self.memory_layout, Segment(PROGRAM, index, size))
+
+        self._remove_hole(segment)
+        split_position = layout_index
+
+        if segment_end > block_end:
+            hole_after = Segment(HOLE, block_end, segment_end - block_end)
+            self.memory_layout.insert(layout_index+1, hole_after)
+            self._add_hole(hole_after)
+
+        if segment.index < index:
+            hole_before = Segment(HOLE, segment.index, index - segment.index)
+            self.memory_layout.insert(layout_index, hole_before)
+            self._add_hole(hole_before)
+            layout_index += 1
         
         segment.type = PROGRAM
         segment.size = size
+        segment.used = len(program_bytes)
         segment.index = index
 
-        self.main_memory[index:index+size] = program_bytes
+        self.main_memory[index:index+len(program_bytes)] = program_bytes
+        self.programs[int(program_bytes[0])] = segment
+        self.placement.placed(index, size)
 
-        return next_layout_index
+        if self.layout_listeners:
+            self._emit(SPLIT, split_position, 1, len(self.memory_layout) - layout_count + 1)
+
+        return layout_index
 
     def get_program_segment(self, pid:int) -> Tuple[int, Segment]:
-        for layout_index, program in self.get_all_segments_of_type(PROGRAM):
-            if self.main_memory[program.index] == pid:
-                return (layout_index, program.copy())
-            
-        raise MSIDNotFound(pid, self.main_memory, self.memory_layout)
+        program = self.programs.get(pid)
+        if program is None:
+            raise MSIDNotFound(pid, self.main_memory, self.memory_layout)
+
+        return (self._layout_position(program.index), program.copy())
+
+    def read_program(self, pid:int) -> NDArray:
+        program = self.programs.get(pid)
+        if program is None:
+            raise MSIDNotFound(pid, self.main_memory, self.memory_layout)
+
+        return self.main_memory[program.index:program.index + program.used].copy()
+
+    def has_program(self, pid:int) -> bool:
+        return pid in self.programs
             
     def get_program_id(self, segment:Segment) -> int:
         return int(self.main_memory[segment.index])
 
-    def swap_out(self, pid:int) -> List[Byte]:
-        layout_index, _ = self.get_program_segment(pid)
+    def swap_out(self, pid:int) -> NDArray:
+        program_to_remove = self.programs.pop(pid, None)
+        if program_to_remove is None:
+            raise MSIDNotFound(pid, self.main_memory, self.memory_layout)
 
-        program_to_remove = self.memory_layout[layout_index]
-        program_bytes = self.main_memory[program_to_remove.index:program_to_remove.index+program_to_remove.size]
-        self.main_memory[program_to_remove.index:program_to_remove.index+program_to_remove.size] = [NULL] * program_to_remove.size
+        layout_index = self._layout_position(program_to_remove.index)
+        program_bytes = self.main_memory[program_to_remove.index:program_to_remove.index+program_to_remove.used].copy()
+        # neighbouring holes are already clear, only the program range is
+        self._clear(program_to_remove.index, program_to_remove.index+program_to_remove.size)
+        layout_count = len(self.memory_layout)
 
+        if layout_index + 1 < len(self.memory_layout):
+            next_segment = self.memory_layout[layout_index+1]
+            if next_segment.type == HOLE:
+                self._remove_hole(next_segment)
+                program_to_remove.size = program_to_remove.size + next_segment.size
+                self.memory_layout.pop(layout_index+1)
 
-        next_segment = self.memory_layout[layout_index+1]
-        prev_segment = self.memory_layout[layout_index-1]
-        
-        if next_segment.type == HOLE:
-            program_to_remove.size = program_to_remove.size + next_segment.size
-            self.memory_layout.pop(layout_index+1)
-
-        if prev_segment.type == HOLE:
-            program_to_remove.index = prev_segment.index
-            program_to_remove.size += prev_segment.size
-            self.memory_layout.pop(layout_index-1)
+        if layout_index > 0:
+            prev_segment = self.memory_layout[layout_index-1]
+            if prev_segment.type == HOLE:
+                self._remove_hole(prev_segment)
+                program_to_remove.index = prev_segment.index
+                program_to_remove.size += prev_segment.size
+                self.memory_layout.pop(layout_index-1)
+                layout_index -= 1
 
         program_to_remove.type = HOLE
-        
-        self.main_memory[program_to_remove.index:program_to_remove.index+program_to_remove.size] = [NULL] * program_to_remove.size
+        self._add_hole(program_to_remove)
+
+        if self.layout_listeners:
+            self._emit(MERGE, layout_index, layout_count - len(self.memory_layout) + 1, 1)
         
         return program_bytes
 
-    def get_bytes(self) -> List[Byte]:
-        return self.main_memory.copy()
+    def grow_program(self, pid:int, p_bytes:list[Byte]|NDArray, reserve:int=0) -> bool:
+        """
+        Appends p_bytes to a program in place. The program's own reservation
+        is used first, then the next hole and, if it is not enough, the program
+        slides down into the previous hole. Up to reserve extra cells are taken
+        from the neighbours as a new reservation. Returns False when the growth
+        doesn't fit and the program has to be relocated.
+        """
+        p_bytes = Byte.to_array(p_bytes)
+        growth = len(p_bytes)
+
+        program = self.programs.get(pid)
+        if program is None:
+            raise MSIDNotFound(pid, self.main_memory, self.memory_layout)
+
+        if program.used + growth <= program.size:
+            self.main_memory[program.index+program.used:program.index+program.used+growth] = p_bytes
+            program.used += growth
+            if self.layout_listeners:
+                self._emit(RESIZE, self._layout_position(program.index), 1, 1)
+            return True
+
+        if self.placement.whole_blocks:
+            return False
+
+        layout_index = self._layout_position(program.index)
+        prev_hole = next_hole = None
+        if layout_index > 0 and self.memory_layout[layout_index-1].type == HOLE:
+            prev_hole = self.memory_layout[layout_index-1]
+        if layout_index + 1 < len(self.memory_layout) and self.memory_layout[layout_index+1].type == HOLE:
+            next_hole = self.memory_layout[layout_index+1]
+
+        prev_size = prev_hole.size if prev_hole else 0
+        next_size = next_hole.size if next_hole else 0
+        needed = program.used + growth - program.size
+        if needed > prev_size + next_size:
+            return False
+
+        region_start = program.index - prev_size
+        region_end = program.index + program.size + next_size
+        old_end = program.index + program.size
+
+        for hole in (prev_hole, next_hole):
+            if hole:
+                self._remove_hole(hole)
+
+        new_size = min(program.size + needed + reserve, region_end - region_start)
+        if needed > next_size:
+            self.main_memory[region_start:region_start+program.used] = self.main_memory[program.index:program.index+program.used]
+            program.index = region_start
+        else:
+            new_size = min(new_size, region_end - program.index)
+
+        self.main_memory[program.index+program.used:program.index+program.used+growth] = p_bytes
+        program.used += growth
+        program.size = new_size
+        end = program.index + program.size
+
+        # slack and whatever the slide left behind must read as NULL
+        self._clear(program.index+program.used, end)
+        if old_end > end:
+            self._clear(end, old_end)
+
+        segments = list()
+        if program.index > region_start:
+            segments.append(Segment(HOLE, region_start, program.index - region_start))
+        segments.append(program)
+        if region_end > end:
+            segments.append(Segment(HOLE, end, region_end - end))
+
+        start = layout_index - (1 if prev_hole else 0)
+        stop = layout_index + (2 if next_hole else 1)
+        self.memory_layout[start:stop] = segments
+
+        for segment in segments:
+            if segment.type == HOLE:
+                self._add_hole(segment)
+
+        if self.layout_listeners:
+            self._emit(MOVE if needed > next_size else RESIZE, start, stop - start, len(segments))
+
+        return True
+
+    def shrink_program(self, pid:int, amount:int, keep_reserved:bool=False) -> NDArray:
+        """
+        Drops the last amount bytes of a program in place. The freed cells are
+        kept as reservation when keep_reserved is set, otherwise the whole
+        unused tail is given back to the next hole. The first byte (the pid)
+        is never dropped.
+        """
+        program = self.programs.get(pid)
+        if program is None:
+            raise MSIDNotFound(pid, self.main_memory, self.memory_layout)
+
+        amount = max(0, min(amount, program.used - 1))
+        used_end = program.index + program.used
+        popped_bytes = self.main_memory[used_end-amount:used_end].copy()
+
+        self._clear(used_end-amount, used_end)
+        program.used -= amount
+
+        released = program.size - program.used
+        if keep_reserved or self.placement.whole_blocks or released == 0:
+            if self.layout_listeners:
+                self._emit(RESIZE, self._layout_position(program.index), 1, 1)
+            return popped_bytes
+
+        end = program.index + program.size
+        program.size = program.used
+
+        layout_index = self._layout_position(program.index)
+        if layout_index + 1 < len(self.memory_layout) and self.memory_layout[layout_index+1].type == HOLE:
+            next_hole = self.memory_layout[layout_index+1]
+            self._remove_hole(next_hole)
+            next_hole.index -= released
+            next_hole.size += released
+            removed = 2
+        else:
+            next_hole = Segment(HOLE, end - released, released)
+            self.memory_layout.insert(layout_index+1, next_hole)
+            removed = 1
+
+        self._add_hole(next_hole)
+
+        if self.layout_listeners:
+            self._emit(RESIZE, layout_index, removed, 2)
+
+        return popped_bytes
+
+    def _free_run_end(self, layout_index:int) -> int:
+        # end address of the free run that starts right before layout_index
+        if layout_index >= len(self.memory_layout):
+            return self.memory_size
+
+        segment = self.memory_layout[layout_index]
+        if segment.type == HOLE:
+            return segment.index + segment.size
+
+        return segment.index
+
+    def compact(self, size:int|None=None) -> int:
+        """
+        Slides PROGRAM segments down towards index 0 and rebuilds the layout in
+        a single pass. When size is given, stops as soon as a hole of at least
+        size cells exists. Returns how many programs were moved.
+        """
+        if size is not None and self.free_space.largest() >= size:
+            return 0
+
+        if self.placement.whole_blocks:
+            return self._pack_blocks()
+
+        compacted = list()
+        cursor = 0
+        moved = 0
+        layout_index = 0
+
+        while layout_index < len(self.memory_layout):
+            segment = self.memory_layout[layout_index]
+            layout_index += 1
+
+            if segment.type == HOLE:
+                self._remove_hole(segment)
+                continue
+
+            if segment.index != cursor:
+                self.main_memory[cursor:cursor+segment.size] = self.main_memory[segment.index:segment.index+segment.size]
+                segment.index = cursor
+                moved += 1
+
+            compacted.append(segment)
+            cursor += segment.size
+
+            if size is not None and self._free_run_end(layout_index) - cursor >= size:
+                break
+
+        free_run_end = self._free_run_end(layout_index)
+        if layout_index < len(self.memory_layout) and self.memory_layout[layout_index].type == HOLE:
+            self._remove_hole(self.memory_layout[layout_index])
+            layout_index += 1
+
+        if free_run_end > cursor:
+            hole = Segment(HOLE, cursor, free_run_end - cursor)
+            compacted.append(hole)
+            self._add_hole(hole)
+            self._clear(cursor, free_run_end)
+
+        self.memory_layout[:] = compacted + self.memory_layout[layout_index:]
+
+        if self.layout_listeners:
+            self._emit(MOVE, 0, layout_index, len(compacted))
+
+        return moved
+
+    def _pack_blocks(self) -> int:
+        # power-of-two blocks packed from the largest down leave no gaps and
+        # every block lands on an address aligned to its size, but programs
+        # may swap order so the moved ones are copied out first
+        programs = sorted((segment for segment in self.memory_layout if segment.type == PROGRAM),
+                          key=lambda segment: (-segment.size, segment.index))
+        layout_count = len(self.memory_layout)
+
+        for segment in self.memory_layout:
+            if segment.type == HOLE:
+                self._remove_hole(segment)
+
+        moves = list()
+        cursor = 0
+        for segment in programs:
+            if segment.index != cursor:
+                moves.append((segment, cursor, self.main_memory[segment.index:segment.index+segment.size].copy()))
+            cursor += segment.size
+
+        for segment, index, cells in moves:
+            self.main_memory[index:index+segment.size] = cells
+            segment.index = index
+
+        compacted = list(programs)
+        if cursor < self.memory_size:
+            hole = Segment(HOLE, cursor, self.memory_size - cursor)
+            compacted.append(hole)
+            self._add_hole(hole)
+            self._clear(cursor, self.memory_size)
+
+        self.memory_layout[:] = compacted
+
+        if self.layout_listeners:
+            self._emit(MOVE, 0, layout_count, len(compacted))
+
+        return len(moves)
+
+    def get_bytes(self) -> NDArray:
+        if self._dirty:
+            self._clean()
+
+        # read-only view, callers that need to mutate must copy it themselves
+        view = self.main_memory.view()
+        view.flags.writeable = False
+        return view
 
     def get_memory_layout(self) -> List[Segment]:
         return (layout for layout in self.memory_layout)
 
+    def get_segments_in_range(self, start:int, end:int, limit:int|None=None) -> List[Segment]:
+        # copies of the segments overlapping [start, end), found by bisection
+        # so only the visible part of the layout is materialized
+        start = max(start, 0)
+        end = min(end, self.memory_size)
+        if start >= end:
+            return list()
+
+        first = max(self._layout_position(start), 0)
+        last = self._layout_position(end - 1) + 1
+        if limit is not None:
+            last = min(last, first + limit)
+
+        return [segment.copy() for segment in self.memory_layout[first:last]]
+
+    def get_occupancy(self, buckets:int, start:int=0, end:int|None=None) -> NDArray:
+        """
+        Fraction of allocated cells in each of buckets equal address ranges of
+        [start, end). Computed from the program extents with prefix sums, so
+        the cost depends on the number of programs and buckets, not cells.
+        """
+        end = self.memory_size if end is None else min(end, self.memory_size)
+        start = max(start, 0)
+        edges = np.linspace(start, end, buckets + 1)
+
+        extents = np.array(sorted((program.index, program.size) for program in self.programs.values()), dtype=np.int64).reshape(-1, 2)
+        starts = extents[:, 0]
+        ends = starts + extents[:, 1]
+        allocated_before = np.concatenate(([0], np.cumsum(extents[:, 1])))
+
+        # allocated cells below every edge: whole programs starting before
+        # it, minus the part of the last one that lies past the edge
+        position = np.searchsorted(starts, edges, side="left")
+        covered = allocated_before[position].astype(np.float64)
+        overlap = position > 0
+        covered[overlap] -= np.maximum(ends[position[overlap] - 1] - edges[overlap], 0)
+
+        widths = np.diff(edges)
+        return np.divide(np.diff(covered), widths, out=np.zeros(buckets), where=widths > 0)
+
     def get_next_free_block(self, size:int) -> Segment:
-        for segment in self.memory_layout:
-            if segment.type == HOLE and segment.size >= size:
-                    return Segment(HOLE, segment.index, size)
+        index = self.placement.find(size)
+        if index is None:
+            return None
 
-        return None
+        return Segment(HOLE, index, self.placement.block_size(size))
         
     def get_next_segment(self, index:int=0, stype:str=PROGRAM) -> Tuple[int, Segment]:
         return next(((layout_index, segment) for layout_index, segment in enumerate(self.memory_layout[index:]) if segment.type == stype), None)
@@ -120,14 +520,21 @@ class Memory:
         return ((layout_index, segment) for layout_index, segment in enumerate(self.memory_layout[index:]) if segment.type == stype)
     
     def get_total_unallocated_memory(self) -> int:
-        combined_program_memory = sum(
-            segment.size for segment in self.memory_layout if segment.type == PROGRAM
-        )
-
-        return self.memory_size - combined_program_memory
+        return self.free_memory
     
     def get_total_allocated_memory(self) -> int:
-        return sum(
-            segment.size for segment in self.memory_layout if segment.type == PROGRAM
+        return self.memory_size - self.free_memory
+
+    def get_fragmentation(self) -> float:
+        return self.get_stats().fragmentation
+
+    def get_stats(self) -> MemoryStats:
+        return MemoryStats(
+            self.memory_size,
+            self.memory_size - self.free_memory,
+            len(self.programs),
+            self.hole_count,
+            self.free_space.largest(),
         )
 
+
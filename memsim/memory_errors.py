@@ -1,13 +1,14 @@
 from .byte import Byte, NULL
 from .safe_list import SafeList
 from typing import Dict, List
+from numpy.typing import NDArray
 from .segment import Segment
 
 class MemSimError(Exception):
     pass
 
 class MSNotEnoughMemory(MemSimError):
-    def __init__(self, memory:List[Byte], layout:SafeList[Segment], requested:int):
+    def __init__(self, memory:NDArray, layout:SafeList[Segment], requested:int):
         super().__init__(f"Not enough memory for the requested block: {requested}\nMemory logged")
 
         self.memory = memory
@@ -15,7 +16,7 @@ class MSNotEnoughMemory(MemSimError):
         self.requested_block = requested
 
 class MSNotEnoughDiscMemory(MemSimError):
-    def __init__(self, memory:List[Byte], layout:SafeList[Segment], requested:int):
+    def __init__(self, memory:NDArray, layout:SafeList[Segment], requested:int):
         super().__init__(f"Not enough disc memory for the requested block: {requested}\nMemory logged")
 
         self.memory = memory
@@ -23,7 +24,7 @@ class MSNotEnoughDiscMemory(MemSimError):
         self.requested_block = requested
 
 class MSFaultyAccess(MemSimError):
-    def __init__(self, memory:List[Byte], layout:SafeList[Segment], block:Segment):
+    def __init__(self, memory:NDArray, layout:SafeList[Segment], block:Segment):
         super().__init__(f"Faulty access at block: {block}\nMemory logged")
 
         self.memory = memory
@@ -31,7 +32,7 @@ class MSFaultyAccess(MemSimError):
         self.block = block
 
 class MSNoAllocationBlockAvailable(MemSimError):
-    def __init__(self, memory:List[Byte], layout:SafeList[Segment], block:Segment):
+    def __init__(self, memory:NDArray, layout:SafeList[Segment], block:Segment):
         super().__init__(f"No allocation section available for: {block}\nMemory logged")
 
         self.memory = memory
@@ -39,7 +40,7 @@ class MSNoAllocationBlockAvailable(MemSimError):
         self.block = block
 
 class MSIDNotFound(MemSimError):
-    def __init__(self, id_search:int, memory:List[Byte], layout:SafeList[Segment]):
+    def __init__(self, id_search:int, memory:NDArray, layout:SafeList[Segment]):
         super().__init__(f"No match found for ID {id_search}\nMemory logged")
 
         self.memory = memory
@@ -2,40 +2,79 @@ from .os import OS
 from .program import Program
 from .memory import Memory, PROGRAM, HOLE
 from .byte import Byte
+from .scheduler import EventScheduler
+from .placement import FIRST_FIT
+from .metrics import MetricsRecorder
+from .profiling import Profiler
+from .config_loader import ConfigSource
 import json
-import random
+import numpy as np
+from numpy.typing import NDArray
+from typing import Dict
 
 INSERT = "insert"
 POP = "pop"
 TERMINATE = "terminate"
+READ = "read"
 
 class MEMSIM:
-    def __init__(self, config_path:str, auto_mode:bool=True):
+    def __init__(self, config_path:str|Dict, auto_mode:bool=True, seed:int|None=None):
         self.dt = 0
         self.running = True
         self.auto = auto_mode
         self.os = None
         self.script = None
-
-        programs = None
-        ram_size = None
-        disc_size = None
-
-        with open(config_path, "r") as config_file:
-            config_data = json.load(config_file)
-
-            ram_size = config_data["setup"]["ram_size"]
-            disc_size = config_data["setup"]["disc_size"]
-            programs = config_data["script"]["programs"]
-
-        self.os = OS(ram_size, disc_size)
+        self.scheduler = EventScheduler()
+        self.metrics = None
+        self.profiler = None
+
+        # the script is read incrementally, only the setup is kept around
+        config = ConfigSource(config_path)
+        setup = config.setup
+
+        ram_size = setup["ram_size"]
+        disc_size = setup["disc_size"]
+
+        # every simulation owns its generator so auto runs are reproducible
+        # and independent of each other
+        if seed is None:
+            seed = setup.get("seed")
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+        growth_reservation = setup.get("growth_reservation", dict())
+        self.os = OS(
+            ram_size,
+            disc_size,
+            setup.get("placement", FIRST_FIT),
+            growth_reservation.get("factor"),
+            growth_reservation.get("slack", 0),
+            setup.get("lazy_clear", False),
+            setup.get("disc_backing"),
+            setup.get("eviction"),
+            setup.get("disc_growth"),
+        )
+
+        metrics = setup.get("metrics")
+        if metrics is not None:
+            self.enable_metrics(**metrics)
+
+        if setup.get("profile", False):
+            self.enable_profiling()
+
+        # script only records what auto mode generates, scripted events go
+        # straight to the scheduler
         self.script = dict()
-        for program in programs:
-            pid = self.os.load_program(Program(program["initialize"]["data"]))
-            if self.auto:
-                self.script[pid] = dict()
-            else:
-                self.script[pid] = program["timestamps"]
+        pids = list()
+        for data, timestamps in config.programs():
+            pid = self.os.load_program(Program(data))
+            pids.append(pid)
+            self.script[pid] = dict()
+            if not self.auto and timestamps is not None:
+                self.scheduler.schedule_script(pid, timestamps)
+
+        if not self.auto and config.streamed:
+            self.scheduler.schedule_stream(config.events(pids))
 
         if self.auto:
             self.prepare_next_step()
@@ -44,96 +83,145 @@ class MEMSIM:
         return self.os.ram
     
     def advance_sim(self, dt:int):
-        for pid, program in self.script.items():
-            for timestamps, action in program.items():
-                if dt == int(timestamps):
-                    command = next(iter(action))
-                    param = action[command]
+        for pid, command, param in self.scheduler.pop(dt):
+            if command == INSERT:
+                self.os.add_bytes_program(pid, param)
 
-                    if command == INSERT:
-                        self.os.add_bytes_program(pid, param)
+            if command == POP:
+                self.os.pop_bytes_program(pid, param)
 
-                    if command == POP:
-                        self.os.pop_bytes_program(pid, param)
+            if command == TERMINATE:
+                self.os.terminate_program(pid)
 
-                    if command == TERMINATE:
-                        self.os.terminate_program(pid)
+            if command == READ:
+                self.os.read_program(pid)
+
+    def next_event_tick(self) -> int|None:
+        return self.scheduler.next_tick(self.dt)
+
+    def _new_program_bytes(self, size:int) -> NDArray:
+        return self.rng.integers(0, Byte.MAX, size=size, dtype=Byte.dtype)
 
     def prepare_next_step(self):
         next_df = self.dt + 1
-        unallocated_memory = self.os.ram.get_total_unallocated_memory()
-        number_programs = sum(1 for _ in self.os.ram.get_all_segments_of_type(PROGRAM))
-        allocated_memory = self.os.ram.get_total_allocated_memory()
-        ram_size = self.os.ram.memory_size
-
-        for idx, program in self.os.ram.get_all_segments_of_type(PROGRAM):
-            choices = [INSERT for _ in range(1, int(unallocated_memory / number_programs))]
-            choices.extend([POP for _ in range(1, int(allocated_memory / number_programs))])
-            choices.extend([TERMINATE for _ in range(1, number_programs)])
-            random.shuffle(choices)
-
-            choice = random.choice(choices)
+        # the actions of the next tick are regenerated from scratch, the first
+        # tick is prepared both by __init__ and by step
+        self.scheduler.pop(next_df)
+        stats = self.os.ram.get_stats()
+        unallocated_memory = stats.unallocated
+        number_programs = stats.programs
+        allocated_memory = stats.allocated
+        ram_size = stats.memory_size
+
+        hole_sizes = np.fromiter((segment.size for segment in self.os.ram.memory_layout if segment.type == HOLE), dtype=np.int64)
+
+        for pid, program in list(self.os.ram.programs.items()):
+            # same weights as drawing from a list with one entry per unit,
+            # without building the list
+            insert_weight = max(0, int(unallocated_memory / number_programs) - 1)
+            pop_weight = max(0, int(allocated_memory / number_programs) - 1)
+            terminate_weight = max(0, number_programs - 1)
+
+            total_weight = insert_weight + pop_weight + terminate_weight
+            if total_weight == 0:
+                continue
+
+            draw = self.rng.integers(0, total_weight)
+            if draw < insert_weight:
+                choice = INSERT
+            elif draw < insert_weight + pop_weight:
+                choice = POP
+            else:
+                choice = TERMINATE
+
             param = None
 
             if choice == INSERT:
-                segs = self.os.ram.get_all_segments_of_type("HOLE")
-                seg_choices = list()
-                for idx, hole in segs:
-                    seg_choices.append(hole.size)
-                    
-                allocation_size = random.choice(seg_choices)
+                if len(hole_sizes) == 0:
+                    continue
+
+                allocation_size = int(self.rng.choice(hole_sizes))
                 if allocation_size + allocated_memory >= ram_size:
                     continue
                 
-                stride = random.randint(1, allocation_size)
-                param = [random.randrange(0, Byte.MAX) for _ in range(int(stride*0.40))]
+                stride = int(self.rng.integers(1, allocation_size, endpoint=True))
+                param = self._new_program_bytes(int(stride*0.40))
                 unallocated_memory -= allocation_size
                 
             elif choice == POP:
-                if program.size <= 2:
+                if program.used <= 2:
                     continue
 
-                param = random.randrange(1, program.size-1)
+                param = int(self.rng.integers(1, program.used-1))
                 unallocated_memory += param
 
             elif choice == TERMINATE:
                 param = 0
 
-            else:
-                continue
-
-            pid = self.os.ram.get_program_id(program)
             self.script[pid][next_df] = dict()
             self.script[pid][next_df][choice] = param
+            self.scheduler.schedule(next_df, pid, choice, param)
 
         if number_programs == 0:
-            for i in range(random.randrange(0, int(ram_size/32))):
-                allocation_size = random.randrange(1, int(ram_size/16))
+            for i in range(self.rng.integers(0, max(1, int(ram_size/32)))):
+                allocation_size = int(self.rng.integers(1, max(2, int(ram_size/16))))
                 if allocation_size + allocated_memory < ram_size:
-                    new_program_bytes = [random.randrange(0, Byte.MAX) for _ in range(0, allocation_size)]
                     unallocated_memory -= allocation_size
-                    new_pid = self.os.load_program(Program(new_program_bytes))
+                    new_pid = self.os.load_program(Program(self._new_program_bytes(allocation_size)))
                     self.script[new_pid] = dict()
 
-        elif random.randrange(0, number_programs) == 0:
-            allocation_size = random.randrange(1, int(ram_size/16))
+        elif self.rng.integers(0, number_programs) == 0:
+            allocation_size = int(self.rng.integers(1, max(2, int(ram_size/16))))
             if allocation_size + allocated_memory < ram_size:
-                new_program_bytes = [random.randrange(0, Byte.MAX) for _ in range(0, allocation_size)]
                 unallocated_memory -= allocation_size
-                new_pid = self.os.load_program(Program(new_program_bytes))
+                new_pid = self.os.load_program(Program(self._new_program_bytes(allocation_size)))
                 self.script[new_pid] = dict()
 
+    def enable_metrics(self, capacity:int=1 << 16) -> MetricsRecorder:
+        self.metrics = MetricsRecorder(self.os.ram, capacity)
+        return self.metrics
+
+    def enable_profiling(self) -> Profiler:
+        # programs loaded before this call are not measured
+        self.profiler = Profiler()
+        self.profiler.instrument(self.os)
+        return self.profiler
+
     def step(self):
         if self.running:
+            self.os.tick = self.dt
             self.advance_sim(self.dt)
 
             if self.auto:
                 self.prepare_next_step()
 
+            if self.metrics is not None:
+                self.metrics.record(self.dt, self.os.compactions)
+
         self.dt += 1
 
+    def skip_to_next_event(self, limit:int|None=None):
+        # ticks without events are no-ops in scripted mode, jump straight over
+        # them without going past limit
+        if not self.auto:
+            next_tick = self.next_event_tick()
+            if next_tick is None or (limit is not None and next_tick > limit):
+                next_tick = limit
+
+            if next_tick is not None and next_tick > self.dt:
+                self.dt = next_tick
+
+        if limit is None or self.dt < limit:
+            self.step()
+
     def stop_simulation(self):
+        if self.profiler is not None:
+            self.profiler.unwrap()
+            self.profiler.dump("profile_output.json")
+
         self.os.clear_all()
+        self.os.disc.close()
+        self.scheduler.clear()
         self.script = None
         self.running = False
         self.auto = False
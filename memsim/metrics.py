@@ -0,0 +1,85 @@
+import csv
+from typing import Dict
+import numpy as np
+from numpy.typing import NDArray
+from .memory import Memory
+from .ring_buffer import RingBuffer
+
+# scalar series recorded every tick, in export order
+COLUMNS = ("tick", "fragmentation", "holes", "largest_hole", "free_memory", "programs", "compactions")
+
+class MetricsRecorder:
+    """
+    Per-tick fragmentation time series of a Memory. Every record reads the
+    Memory running counters (no layout scans) into preallocated ring buffers,
+    so the cost per tick is constant and only the latest capacity ticks are
+    kept.
+    """
+
+    def __init__(self, memory:Memory, capacity:int=1 << 16):
+        self.memory = memory
+        self.capacity = capacity
+        self.series:Dict[str, RingBuffer] = {
+            column: RingBuffer(capacity, np.float64 if column == "fragmentation" else np.int64)
+            for column in COLUMNS
+        }
+        # one row per tick, column k counts holes of size in [2**k, 2**(k+1))
+        self.histogram_width = len(memory.hole_histogram)
+        self.hole_sizes = RingBuffer(capacity, np.int64, self.histogram_width)
+        self.last_compactions = 0
+
+    def record(self, tick:int, compactions:int):
+        # compactions is the running total, the series keeps how many
+        # happened since the previous record
+        stats = self.memory.get_stats()
+        series = self.series
+
+        series["tick"].append(tick)
+        series["fragmentation"].append(stats.fragmentation)
+        series["holes"].append(stats.holes)
+        series["largest_hole"].append(stats.largest_hole)
+        series["free_memory"].append(stats.unallocated)
+        series["programs"].append(stats.programs)
+        series["compactions"].append(compactions - self.last_compactions)
+        self.last_compactions = compactions
+
+        self.hole_sizes.append(self.memory.hole_histogram[:self.histogram_width])
+
+    def compaction_frequency(self) -> float:
+        # compactions per recorded tick over the kept window
+        if len(self.series["tick"]) == 0:
+            return 0.0
+
+        return float(self.series["compactions"].values().mean())
+
+    def to_arrays(self) -> Dict[str, NDArray]:
+        arrays = {column: buffer.values() for column, buffer in self.series.items()}
+        arrays["hole_sizes"] = self.hole_sizes.values()
+        return arrays
+
+    def save(self, path:str):
+        # numpy binary archive, reload with np.load(path)
+        np.savez(path, **self.to_arrays())
+
+    def to_csv(self, path:str):
+        arrays = self.to_arrays()
+        histogram = arrays["hole_sizes"]
+
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(list(COLUMNS) + [f"holes_2^{k}" for k in range(self.histogram_width)])
+            for row in range(len(arrays["tick"])):
+                writer.writerow([arrays[column][row].item() for column in COLUMNS] + histogram[row].tolist())
+
+    def export(self, path:str):
+        if path.endswith(".csv"):
+            self.to_csv(path)
+        else:
+            self.save(path)
+
+    def clear(self):
+        for buffer in self.series.values():
+            buffer.clear()
+
+        self.hole_sizes.clear()
+        self.last_compactions = 0
@@ -1,78 +1,200 @@
+import numpy as np
 from .byte import Byte, NULL
 from typing import List, Dict, Union, Tuple
 from .ram import RAM
 from .disc import Disc
 from .program import Program
-from .memory_errors import MSNotEnoughMemory, MSNotEnoughDiscMemory, MSIDNotFound
+from .memory_errors import MemSimError, MSNotEnoughMemory, MSNotEnoughDiscMemory, MSIDNotFound
 from .segment import Segment, PROGRAM, HOLE
 from .memory import Memory
+from .id_allocator import IDAllocator
+from .placement import FIRST_FIT, create_placement
+from .eviction import create_eviction
+from .access_tracker import AccessTracker
 
 ID_IN_RAM = "id_in_ram"
 ID_IN_DISC = "id_in_disc"
 
 class OS:
-    def __init__(self, ram_size:Byte.dtype=Byte.MAX+1, disc_size:Byte.dtype=Byte.MAX+1):
-        self.disc = Disc(disc_size)
-        self.ram = RAM(ram_size)
-        self.ids = list()
+    def __init__(self, ram_size:Byte.dtype=Byte.MAX+1, disc_size:Byte.dtype=Byte.MAX+1, placement:str=FIRST_FIT,
+                 growth_factor:float|None=None, growth_slack:int=0, lazy_clear:bool=False, disc_backing:str|None=None,
+                 eviction:str|None=None, disc_growth:float|None=None):
+        self.disc = Disc(disc_size, lazy_clear, disc_backing)
+        self.ram = RAM(ram_size, create_placement(placement), lazy_clear)
+        # pid -> storage (ID_IN_RAM or ID_IN_DISC), the segment itself is
+        # indexed by the Memory holding the program
+        self.ids:Dict[int, str] = dict()
+        self.id_allocator = IDAllocator()
 
-    def _load_program_mem(self, memory:Memory, program:Program):
+        # growth reservations: programs that already grew get
+        # used * (growth_factor - 1) + growth_slack spare cells in RAM
+        if growth_factor is not None and growth_factor < 1.0:
+            raise ValueError(f"growth_reservation.factor must be at least 1.0, got {growth_factor}")
+        if growth_slack < 0:
+            raise ValueError(f"growth_reservation.slack can't be negative, got {growth_slack}")
+
+        self.growth_factor = growth_factor
+        self.growth_slack = growth_slack
+        self.growths:Dict[int, int] = dict()
+
+        # RAM pressure: with an eviction policy, loads that don't fit swap
+        # victims out to the Disc, and with a disc_growth factor the Disc is
+        # expanded by that factor instead of running out
+        self.eviction = create_eviction(eviction)
+        self.disc_growth = disc_growth
+
+        # recency of every program, tick is kept up to date by the simulation
+        self.tracker = AccessTracker()
+        self.tick = 0
+
+        self.allocations = 0
+        self.swaps = 0
+        self.compactions = 0
+        self.relocations = 0
+        self.evictions = 0
+        self.disc_expansions = 0
+
+    def _find_block(self, memory:Memory, p_size:int, reserve:int=0) -> Segment|None:
+        # the reservation is a bonus, it is dropped when it doesn't fit
+        memory_block = None
+        if reserve:
+            memory_block = memory.get_next_free_block(p_size + reserve)
+        if not memory_block:
+            memory_block = memory.get_next_free_block(p_size)
+
+        if memory_block is None and memory is self.ram and memory.get_total_unallocated_memory() >= p_size:
+            # compacts only until a big enough hole shows up, the placement
+            # policy may still reject it (e.g. buddy block sizes) and
+            # then the whole RAM is compacted
+            memory.compact(p_size)
+            self.compactions += 1
+
+            memory_block = memory.get_next_free_block(p_size)
+            if memory_block is None:
+                memory.compact()
+                memory_block = memory.get_next_free_block(p_size)
+
+        return memory_block
+
+    def _evict_until_fits(self, p_size:int) -> Segment|None:
+        # swaps victims out to the Disc until the RAM has room for p_size
+        while True:
+            victim = self.eviction.select(self)
+            if victim is None:
+                return None
+
+            self._swap_ram_to_disc(victim)
+            self.evictions += 1
+
+            memory_block = self._find_block(self.ram, p_size)
+            if memory_block:
+                return memory_block
+
+    def _expand_disc_for(self, p_size:int) -> Segment|None:
+        # grows geometrically so repeated expansions stay amortized O(1) per cell
+        last = self.disc.memory_layout[len(self.disc.memory_layout)-1]
+        tail = last.size if last.type == HOLE else 0
+        growth = max(p_size - tail, int(self.disc.memory_size * (self.disc_growth - 1.0)))
+
+        self.disc.expand_disc(growth)
+        self.disc_expansions += 1
+
+        return self._find_block(self.disc, p_size)
+
+    def _load_program_mem(self, memory:Memory, program:Program, reserve:int=0):
         p_bytes = program.stream_bytes()
         p_size = len(p_bytes)
 
-        memory_block = memory.get_next_free_block(p_size)
-        if memory_block:
-            memory.swap_in(Segment(PROGRAM, memory_block.index, memory_block.size), p_bytes)
-            return
+        memory_block = self._find_block(memory, p_size, reserve)
 
-        elif memory is self.ram and memory.get_total_unallocated_memory() >= p_size:
-            self.shrink_ram()
-            memory_block = memory.get_next_free_block(p_size)
-            memory.swap_in(Segment(PROGRAM, memory_block.index, memory_block.size), p_bytes)
-            return
+        # evicting is pointless when not even the whole RAM would fit the program
+        if memory_block is None and memory is self.ram and self.eviction is not None \
+                and memory.placement.block_size(p_size) <= memory.memory_size:
+            memory_block = self._evict_until_fits(p_size)
 
-        raise MSNotEnoughMemory(memory.main_memory, memory.memory_layout, p_size)
-        
-    def _search_lowest_id(self):
-        if not self.ids:
-            return 0x0
-        
-        self.ids.sort(key=lambda x: x["id"])
-        biggest_id = self.ids[-1]["id"] + 2
-        for i in range(0, biggest_id):
-            existing_id = any(i in ids.values() for ids in self.ids)
-            if not existing_id:
-                return i
+        if memory_block is None and memory is self.disc:
+            if self.disc_growth is None:
+                raise MSNotEnoughDiscMemory(memory.main_memory, memory.memory_layout, p_size)
+
+            memory_block = self._expand_disc_for(p_size)
+
+        if memory_block is None:
+            raise MSNotEnoughMemory(memory.main_memory, memory.memory_layout, p_size)
+
+        memory.swap_in(Segment(PROGRAM, memory_block.index, memory_block.size), p_bytes)
+        self.allocations += 1
+
+    def _restore_program(self, memory:Memory, p_bytes:np.ndarray):
+        # puts a program back after a failed relocation, the space it has just
+        # freed is always enough so the placement policy is bypassed
+        if memory.placement.whole_blocks:
+            block = memory.get_next_free_block(len(p_bytes))
+            if block is not None:
+                memory.swap_in(Segment(PROGRAM, block.index, block.size), p_bytes)
+                return
+
+        size = memory.placement.block_size(len(p_bytes))
+        index = memory.free_space.first_fit(size)
+        if index is None:
+            memory.compact()
+            index = memory.free_space.first_fit(size)
+
+        memory.swap_in(Segment(PROGRAM, index, size), p_bytes)
+
+        if memory.placement.whole_blocks:
+            # the block went wherever it fit, packing puts it back on an
+            # address aligned to its size
+            memory.compact()
+
+    def _reserves(self, memory:Memory, pid:int) -> bool:
+        return memory is self.ram and pid in self.growths and (self.growth_factor is not None or self.growth_slack > 0)
+
+    def _reservation(self, memory:Memory, pid:int, size:int) -> int:
+        if not self._reserves(memory, pid):
+            return 0
+
+        return max(0, int(size * ((self.growth_factor or 1.0) - 1.0)) + self.growth_slack)
+
+    def _search_lowest_id(self) -> int:
+        return self.id_allocator.acquire()
 
     def load_program(self, program:Program) -> int:
         lowest_id = self._search_lowest_id()
-        self.ids.append({"id": lowest_id, "storage": ID_IN_RAM})
-        self._load_program_mem(self.ram, Program([lowest_id] + program.bytes))
+        self.ids[lowest_id] = ID_IN_RAM
+
+        try:
+            self._load_program_mem(self.ram, Program(np.concatenate((Byte.to_array([lowest_id]), program.bytes))))
+        except MemSimError:
+            del self.ids[lowest_id]
+            self.id_allocator.release(lowest_id)
+            raise
+
+        self.tracker.loaded(lowest_id)
         return lowest_id
 
-    def _swap_ram_to_disc(self, pid:int):
-        bytes_to_transfer = self.ram.swap_out(pid)
-        self._load_program_mem(self.disc, Program(bytes_to_transfer))
+    def _transfer(self, pid:int, source:Memory, target:Memory, reserve:int=0):
+        # the program stays in the source until it is placed in the target, so
+        # a failed load (or evictions taking the space it would free) never
+        # loses it
+        bytes_to_transfer = source.read_program(pid)
+        self._load_program_mem(target, Program(bytes_to_transfer), reserve)
+        source.swap_out(pid)
 
-        for i in self.ids:
-            if i["id"] == pid:
-                i["storage"] = ID_IN_DISC
+    def _swap_ram_to_disc(self, pid:int):
+        self._transfer(pid, self.ram, self.disc)
+        self.ids[pid] = ID_IN_DISC
+        self.swaps += 1
 
     def _swap_disc_to_ram(self, pid:int):
-        bytes_to_transfer = self.disc.swap_out(pid)
-        self._load_program_mem(self.ram, Program(bytes_to_transfer))
-        
-        for i in self.ids:
-            if i["id"] == pid:
-                i["storage"] = ID_IN_RAM
+        _, segment = self.disc.get_program_segment(pid)
+        self._transfer(pid, self.disc, self.ram, self._reservation(self.ram, pid, segment.used))
+        self.ids[pid] = ID_IN_RAM
+        self.tracker.loaded(pid)
+        self.swaps += 1
 
     def check_id_memory(self, pid:int, memory:Memory) -> bool:
         mem = ID_IN_RAM if isinstance(memory, RAM) else ID_IN_DISC
-        for pids in self.ids:
-            if pid == pids["id"] and mem == pids["storage"]:
-                return True
-            
-        return False
+        return self.ids.get(pid) == mem
 
     def swap_out(self, pid:int):
         if self.check_id_memory(pid, self.ram):
@@ -89,26 +211,14 @@ class OS:
             raise MSIDNotFound(pid, self.disc.main_memory, self.disc.memory_layout)
 
     def shrink_ram(self):
-        program_ids = list()
-        for program_index, program in self.ram.get_all_segments_of_type(PROGRAM):
-            pid = self.ram.get_program_id(program)
-            program_ids.append(pid)
-            
-            self._swap_ram_to_disc(pid)
-        
-        for pid in program_ids:
-            self._swap_disc_to_ram(pid)
+        self.ram.compact()
+        self.compactions += 1
 
     def _get_program_segment(self, pid:int) -> Tuple[str, int, Segment]:
-        storage = None
+        storage = self.ids.get(pid)
         layout_index = None
         segment = None
 
-        for pids in self.ids:
-            if pids["id"] == pid:
-                storage = pids["storage"]
-                break
-
         if storage == ID_IN_DISC:
             layout_index, segment = self.disc.get_program_segment(pid)
 
@@ -117,47 +227,81 @@ class OS:
         
         return storage, layout_index, segment
 
+    def _get_program_memory(self, pid:int) -> Memory:
+        storage = self.ids.get(pid)
+        if storage is None:
+            raise MSIDNotFound(pid, self.ram.main_memory, self.ram.memory_layout)
+
+        return self.ram if storage == ID_IN_RAM else self.disc
+
+    def _fault_in(self, pid:int):
+        # under RAM pressure handling programs only run from RAM, so touching
+        # one that was evicted brings it back first
+        if self.eviction is not None and self.ids.get(pid) == ID_IN_DISC:
+            self._swap_disc_to_ram(pid)
+
     def add_bytes_program(self, pid:int, p_bytes:List[Byte]):
-        b_size = len(p_bytes)
-        _, layout_index, segment = self._get_program_segment(pid)
+        p_bytes = Byte.to_array(p_bytes)
+        self._fault_in(pid)
+        memory = self._get_program_memory(pid)
+        self.growths[pid] = self.growths.get(pid, 0) + 1
+        self.tracker.touch(pid, self.tick)
+        self.tracker.grown(pid)
 
-        next_layout_index = next_segment = None
-        pack = self.ram.get_next_segment(layout_index, HOLE)
-        if pack:
-            next_layout_index, next_segment = pack
+        reserve = 0
+        if self._reserves(memory, pid):
+            _, segment = memory.get_program_segment(pid)
+            reserve = self._reservation(memory, pid, segment.used + len(p_bytes))
 
-        # confirms the very next segment is a hole
-        if next_layout_index and next_layout_index - layout_index == 1 and next_segment.size >= b_size:
-            program_to_grow = self.ram.swap_out(pid)
-            self._load_program_mem(self.ram, Program(program_to_grow + p_bytes))
+        # grows in place whenever the reservation or the neighbouring holes
+        # can absorb the bytes
+        if memory.grow_program(pid, p_bytes, reserve):
+            return
 
-        else:
-            realloc_size = b_size + segment.size
-            next_segment = self.ram.get_next_free_block(realloc_size)
-            if next_segment:
-                bytes_to_move = self.ram.swap_out(pid) + p_bytes
-                self._load_program_mem(self.ram, Program(bytes_to_move))
-
-            else:
-                raise MSNotEnoughMemory(self.ram, self.ram.memory_layout, realloc_size)
+        # with pressure handling the relocation makes room by itself
+        handles_pressure = self.eviction is not None if memory is self.ram else self.disc_growth is not None
+        if not handles_pressure and memory.get_total_unallocated_memory() < len(p_bytes):
+            _, segment = memory.get_program_segment(pid)
+            raise MSNotEnoughMemory(memory.main_memory, memory.memory_layout, len(p_bytes) + segment.size)
+
+        self.relocations += 1
+        program_bytes = memory.swap_out(pid)
+        try:
+            self._load_program_mem(memory, Program(np.concatenate((program_bytes, p_bytes))), reserve)
+        except MemSimError:
+            self._restore_program(memory, program_bytes)
+            raise
     
-    def pop_bytes_program(self, pid:int, amount:int) -> List[Byte]:
-        popped_bytes = self.ram.swap_out(pid)
-        self._load_program_mem(self.ram, Program(popped_bytes[:len(popped_bytes)-amount]))
-        return popped_bytes
+    def read_program(self, pid:int) -> np.ndarray:
+        self._fault_in(pid)
+        memory = self._get_program_memory(pid)
+        self.tracker.touch(pid, self.tick)
+        return memory.read_program(pid)
+
+    def pop_bytes_program(self, pid:int, amount:int) -> np.ndarray:
+        self._fault_in(pid)
+        memory = self._get_program_memory(pid)
+        self.tracker.touch(pid, self.tick)
+        return memory.shrink_program(pid, amount, self._reserves(memory, pid))
 
     def terminate_program(self, pid:int):
-        for idx, pids in enumerate(self.ids):
-            mem = self.ram if pids["storage"] == ID_IN_RAM else self.disc
-            if pids["id"] == pid:
-                mem.swap_out(pid)
-                self.ids.pop(idx)
-                return
+        storage = self.ids.pop(pid, None)
+        if storage is None:
+            return
+
+        mem = self.ram if storage == ID_IN_RAM else self.disc
+        mem.swap_out(pid)
+        self.growths.pop(pid, None)
+        self.tracker.forget(pid)
+        self.id_allocator.release(pid)
 
     def clear_all(self):
-        for pids in self.ids:
-            mem = self.ram if pids["storage"] == ID_IN_RAM else self.disc
-            mem.swap_out(pids["id"])
+        for pid, storage in self.ids.items():
+            mem = self.ram if storage == ID_IN_RAM else self.disc
+            mem.swap_out(pid)
         
         self.ids.clear()
+        self.growths.clear()
+        self.tracker.clear()
+        self.id_allocator.clear()
     
@@ -0,0 +1,166 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+
+FIRST_FIT = "first_fit"
+NEXT_FIT = "next_fit"
+BEST_FIT = "best_fit"
+WORST_FIT = "worst_fit"
+BUDDY = "buddy"
+
+class PlacementPolicy:
+    """
+    Decides at which address a block of memory is placed. Memory notifies the
+    policy of every hole it creates or removes, so policies can keep their own
+    indexes next to the FreeSpaceIndex.
+    """
+    name = None
+    # the placed block is kept whole while the program lives: it never grows
+    # or shrinks in place and compaction packs the blocks by size
+    whole_blocks = False
+
+    def __init__(self):
+        self.memory = None
+
+    def attach(self, memory):
+        self.memory = memory
+
+    def hole_added(self, index:int, size:int):
+        pass
+
+    def hole_removed(self, index:int, size:int):
+        pass
+
+    def placed(self, index:int, size:int):
+        pass
+
+    def block_size(self, size:int) -> int:
+        # how many cells a request of size actually reserves
+        return size
+
+    def find(self, size:int) -> Optional[int]:
+        raise NotImplementedError
+
+class FirstFit(PlacementPolicy):
+    name = FIRST_FIT
+
+    def find(self, size:int) -> Optional[int]:
+        return self.memory.free_space.first_fit(size)
+
+class NextFit(PlacementPolicy):
+    name = NEXT_FIT
+
+    def __init__(self):
+        super().__init__()
+        self.roving = 0
+
+    def placed(self, index:int, size:int):
+        self.roving = index + size
+
+    def find(self, size:int) -> Optional[int]:
+        index = self.memory.free_space.first_fit(size, self.roving)
+        if index is None:
+            # wraps around to the start of the memory
+            index = self.memory.free_space.first_fit(size)
+
+        return index
+
+class WorstFit(PlacementPolicy):
+    name = WORST_FIT
+
+    def find(self, size:int) -> Optional[int]:
+        largest = self.memory.free_space.largest()
+        if largest < size:
+            return None
+
+        return self.memory.free_space.first_fit(largest)
+
+class SizeIndexedPolicy(PlacementPolicy):
+    """Keeps the holes ordered by (size, index) for smallest-fit lookups."""
+
+    def __init__(self):
+        super().__init__()
+        self.holes:List[Tuple[int, int]] = list()
+
+    def hole_added(self, index:int, size:int):
+        insort(self.holes, (size, index))
+
+    def hole_removed(self, index:int, size:int):
+        position = bisect_left(self.holes, (size, index))
+        if position < len(self.holes) and self.holes[position] == (size, index):
+            self.holes.pop(position)
+
+class BestFit(SizeIndexedPolicy):
+    name = BEST_FIT
+
+    def find(self, size:int) -> Optional[int]:
+        position = bisect_left(self.holes, (size, -1))
+        if position < len(self.holes):
+            return self.holes[position][1]
+
+        return None
+
+def _buddy_blocks(index:int, size:int) -> Iterator[Tuple[int, int]]:
+    # (address, order) of the maximal buddy blocks covering [index, index +
+    # size): the biggest block aligned at each address that still fits
+    end = index + size
+    while index < end:
+        order = (end - index).bit_length() - 1
+        if index:
+            order = min(order, (index & -index).bit_length() - 1)
+
+        yield index, order
+        index += 1 << order
+
+class Buddy(PlacementPolicy):
+    """
+    Binary buddy allocator: requests are rounded up to a power of two and
+    served from per-order free lists, taking the lowest block of the smallest
+    order that fits, which splits it into the request and its free halves. A
+    freed block only merges with its buddy, so two free neighbours that are not
+    buddies stay separate blocks. Memory still shows neighbouring free blocks
+    as a single HOLE, the free lists are rebuilt from every hole it adds or
+    removes (at most log2(size) blocks each).
+    """
+    name = BUDDY
+    whole_blocks = True
+
+    def __init__(self):
+        super().__init__()
+        # free_lists[k] holds the sorted addresses of the free blocks of 2**k cells
+        self.free_lists:List[List[int]] = list()
+
+    def hole_added(self, index:int, size:int):
+        for address, order in _buddy_blocks(index, size):
+            if order >= len(self.free_lists):
+                self.free_lists.extend(list() for _ in range(order + 1 - len(self.free_lists)))
+            insort(self.free_lists[order], address)
+
+    def hole_removed(self, index:int, size:int):
+        for address, order in _buddy_blocks(index, size):
+            free_list = self.free_lists[order]
+            position = bisect_left(free_list, address)
+            if position < len(free_list) and free_list[position] == address:
+                free_list.pop(position)
+
+    def block_size(self, size:int) -> int:
+        return 1 << max(size - 1, 0).bit_length()
+
+    def find(self, size:int) -> Optional[int]:
+        for free_list in self.free_lists[self.block_size(size).bit_length() - 1:]:
+            if free_list:
+                return free_list[0]
+
+        return None
+
+PLACEMENT_POLICIES:Dict[str, Type[PlacementPolicy]] = {
+    policy.name: policy for policy in (FirstFit, NextFit, BestFit, WorstFit, Buddy)
+}
+
+def create_placement(name:str|None) -> PlacementPolicy:
+    if name is None:
+        return FirstFit()
+
+    if name not in PLACEMENT_POLICIES:
+        raise ValueError(f"Unknown placement policy: {name}, expected one of {', '.join(PLACEMENT_POLICIES)}")
+
+    return PLACEMENT_POLICIES[name]()
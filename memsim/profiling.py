@@ -0,0 +1,147 @@
+import functools
+import json
+import time
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+
+# log-linear buckets: values below 2 * SUB_BUCKETS get one bucket each, every
+# power of two above is split into SUB_BUCKETS linear buckets (~12% error)
+SUB_BUCKET_BITS = 3
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+OS_OPERATIONS = (
+    "load_program", "add_bytes_program", "pop_bytes_program", "read_program", "terminate_program",
+    "swap_in", "swap_out", "shrink_ram", "_search_lowest_id", "_load_program_mem",
+)
+MEMORY_OPERATIONS = (
+    "swap_in", "swap_out", "grow_program", "shrink_program", "compact", "get_next_free_block", "get_stats",
+)
+
+def _bucket(value:int) -> int:
+    if value < 2 * SUB_BUCKETS:
+        return value
+
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return 2 * SUB_BUCKETS + (shift - 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+def _bucket_bounds(bucket:int) -> Tuple[int, int]:
+    if bucket < 2 * SUB_BUCKETS:
+        return bucket, bucket
+
+    shift = (bucket - 2 * SUB_BUCKETS) // SUB_BUCKETS + 1
+    mantissa = (bucket - 2 * SUB_BUCKETS) % SUB_BUCKETS + SUB_BUCKETS
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+BUCKETS = _bucket((1 << 63) - 1) + 1
+
+class LatencyHistogram:
+    """HDR-style latency histogram in nanoseconds with a fixed bucket array."""
+
+    def __init__(self):
+        self.counts = np.zeros(BUCKETS, dtype=np.int64)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, nanoseconds:int):
+        self.counts[_bucket(nanoseconds)] += 1
+        self.count += 1
+        self.total += nanoseconds
+        if self.min is None or nanoseconds < self.min:
+            self.min = nanoseconds
+        if nanoseconds > self.max:
+            self.max = nanoseconds
+
+    def percentile(self, percent:float) -> int:
+        # upper bound of the bucket holding the percentile, in nanoseconds
+        if self.count == 0:
+            return 0
+
+        rank = max(1, int(np.ceil(self.count * percent / 100.0)))
+        bucket = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(_bucket_bounds(bucket)[1], self.max)
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "total_ms": self.total / 1e6,
+            "mean_us": self.total / self.count / 1e3 if self.count else 0.0,
+            "min_us": (self.min or 0) / 1e3,
+            "p50_us": self.percentile(50) / 1e3,
+            "p90_us": self.percentile(90) / 1e3,
+            "p99_us": self.percentile(99) / 1e3,
+            "max_us": self.max / 1e3,
+        }
+
+class Profiler:
+    """
+    Opt-in instrumentation: wraps bound methods of single instances, so the
+    classes are untouched and nothing is paid when profiling is off.
+    """
+
+    def __init__(self):
+        self.histograms:Dict[str, LatencyHistogram] = dict()
+        self._wrapped:List[Tuple[object, str]] = list()
+
+    def wrap(self, obj:object, method_name:str, label:str|None=None):
+        label = label or f"{type(obj).__name__}.{method_name}"
+        method = getattr(obj, method_name)
+        # never stacks wrappers, a leftover one is replaced
+        method = getattr(method, "__wrapped__", method)
+
+        setattr(obj, method_name, self.timed(label)(method))
+        self._wrapped.append((obj, method_name))
+
+    def instrument(self, os):
+        for operation in OS_OPERATIONS:
+            self.wrap(os, operation, f"OS.{operation}")
+
+        for name, memory in (("RAM", os.ram), ("Disc", os.disc)):
+            for operation in MEMORY_OPERATIONS:
+                self.wrap(memory, operation, f"{name}.{operation}")
+
+    def unwrap(self):
+        # dropping the instance attribute brings the class method back
+        for obj, method_name in self._wrapped:
+            obj.__dict__.pop(method_name, None)
+
+        self._wrapped.clear()
+
+    def timed(self, label:str) -> Callable:
+        # also usable as a decorator for functions outside the OS and Memory
+        def decorator(function:Callable) -> Callable:
+            histogram = self.histograms.setdefault(label, LatencyHistogram())
+            clock = time.perf_counter_ns
+
+            @functools.wraps(function)
+            def timed(*args, **kwargs):
+                start = clock()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    histogram.record(clock() - start)
+
+            return timed
+
+        return decorator
+
+    def summary(self) -> Dict[str, Dict]:
+        # busiest operations first
+        ordered = sorted(self.histograms.items(), key=lambda item: item[1].total, reverse=True)
+        return {label: histogram.summary() for label, histogram in ordered if histogram.count}
+
+    def format_summary(self) -> str:
+        header = f"{'operation':<28}{'count':>10}{'total ms':>12}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}{'max us':>10}"
+        lines = [header, "-" * len(header)]
+        for label, stats in self.summary().items():
+            lines.append(
+                f"{label:<28}{stats['count']:>10}{stats['total_ms']:>12.3f}{stats['mean_us']:>10.2f}"
+                f"{stats['p50_us']:>10.2f}{stats['p99_us']:>10.2f}{stats['max_us']:>10.2f}"
+            )
+
+        return "\n".join(lines)
+
+    def dump(self, path:str):
+        with open(path, "w") as profile_output:
+            json.dump(self.summary(), profile_output, indent=4)
@@ -4,9 +4,9 @@ from typing import List
 
 # Container class
 class Program:
-    def __init__(self, byte_data:list|List[Byte]):
-        self.bytes = [i if isinstance(i, Byte) else Byte(i) for i in byte_data]
+    def __init__(self, byte_data:list|List[Byte]|NDArray):
+        self.bytes = Byte.to_array(byte_data)
     
-    def stream_bytes(self):
-        return self.bytes.copy()
+    def stream_bytes(self) -> NDArray:
+        return self.bytes
         
\ No newline at end of file
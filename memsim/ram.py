@@ -3,7 +3,8 @@ from typing import List
 from .memory import Memory, HOLE, PROGRAM, Segment
 from .program import Program
 from .memory_errors import MSNotEnoughMemory
+from .placement import PlacementPolicy
 
 class RAM(Memory):
-    def __init__(self, memory_size:Byte.dtype = Byte.MAX+1):
-        super().__init__(memory_size)
\ No newline at end of file
+    def __init__(self, memory_size:Byte.dtype = Byte.MAX+1, placement:PlacementPolicy|None=None, lazy_clear:bool=False):
+        super().__init__(memory_size, placement, lazy_clear)
\ No newline at end of file
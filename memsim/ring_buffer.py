@@ -0,0 +1,45 @@
+import numpy as np
+from numpy.typing import DTypeLike, NDArray
+
+class RingBuffer:
+    """
+    Fixed capacity numpy buffer that keeps the latest appended rows. Storage is
+    allocated once, appends overwrite the oldest row in O(1) once it is full.
+    """
+
+    def __init__(self, capacity:int, dtype:DTypeLike=np.float64, width:int|None=None):
+        if capacity <= 0:
+            raise ValueError(f"RingBuffer capacity must be positive, got {capacity}")
+
+        self.capacity = capacity
+        shape = (capacity,) if width is None else (capacity, width)
+        self.data:NDArray = np.zeros(shape, dtype=dtype)
+        # slot of the next append and number of valid rows
+        self.head = 0
+        self.count = 0
+
+    def append(self, value):
+        self.data[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def values(self) -> NDArray:
+        # chronological copy, oldest row first
+        if self.count < self.capacity:
+            return self.data[:self.count].copy()
+
+        return np.concatenate((self.data[self.head:], self.data[:self.head]))
+
+    def last(self):
+        if self.count == 0:
+            raise IndexError("RingBuffer is empty")
+
+        return self.data[self.head - 1]
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
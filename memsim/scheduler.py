@@ -0,0 +1,98 @@
+import heapq
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+class EventScheduler:
+    """
+    Tick-keyed event queue: every tick holds its actions in dispatch order and
+    a min-heap of pending ticks lets the simulation jump to the next tick that
+    actually has something to do.
+    """
+
+    def __init__(self):
+        self.events:Dict[int, List[Tuple[int, str, Any]]] = dict()
+        self.ticks:List[int] = list()
+        # ticks currently in the heap, so rescheduling a tick never pushes it twice
+        self.queued:Set[int] = set()
+        # lazily pulled (tick, pid, command, param) events and the next one
+        self.stream:Iterator[Tuple[int, int, str, Any]]|None = None
+        self.stream_head:Tuple[int, int, str, Any]|None = None
+
+    def schedule(self, tick:int, pid:int, command:str, param:Any):
+        actions = self.events.get(tick)
+        if actions is None:
+            actions = self.events[tick] = list()
+            if tick not in self.queued:
+                self.queued.add(tick)
+                heapq.heappush(self.ticks, tick)
+
+        actions.append((pid, command, param))
+
+    def schedule_script(self, pid:int, timestamps:Dict[str, Dict[str, Any]]):
+        for timestamp, action in timestamps.items():
+            command = next(iter(action))
+            self.schedule(int(timestamp), pid, command, action[command])
+
+    def schedule_stream(self, events:Iterator[Tuple[int, int, str, Any]]):
+        """
+        Events sorted by tick that are only queued when their tick comes up,
+        so at most one of them is held ahead of time.
+        """
+        self.close_stream()
+        self.stream = iter(events)
+        self._advance_stream()
+
+    def _advance_stream(self):
+        previous = self.stream_head
+        self.stream_head = next(self.stream, None)
+
+        if self.stream_head is None:
+            self.stream = None
+        elif previous is not None and self.stream_head[0] < previous[0]:
+            raise ValueError(f"Streamed events must be sorted by tick, {self.stream_head[0]} came after {previous[0]}")
+
+    def _pull(self, tick:int):
+        while self.stream_head is not None and self.stream_head[0] <= tick:
+            self.schedule(*self.stream_head)
+            self._advance_stream()
+
+    def close_stream(self):
+        if self.stream is not None and hasattr(self.stream, "close"):
+            self.stream.close()
+
+        self.stream = None
+        self.stream_head = None
+
+    def _drop_tick(self):
+        tick = heapq.heappop(self.ticks)
+        self.queued.discard(tick)
+        self.events.pop(tick, None)
+
+    def pop(self, tick:int) -> List[Tuple[int, str, Any]]:
+        self._pull(tick)
+        actions = self.events.pop(tick, [])
+
+        # the heap would otherwise keep every dispatched tick when nothing
+        # calls next_tick, as in auto mode
+        while self.ticks and self.ticks[0] <= tick:
+            self._drop_tick()
+
+        return actions
+
+    def next_tick(self, tick:int=0) -> int|None:
+        # drops ticks already dispatched or left behind before peeking
+        while self.ticks and (self.ticks[0] < tick or self.ticks[0] not in self.events):
+            self._drop_tick()
+
+        if self.stream_head is not None and (not self.ticks or self.stream_head[0] < self.ticks[0]):
+            return max(self.stream_head[0], tick)
+
+        return self.ticks[0] if self.ticks else None
+
+    def clear(self):
+        self.events.clear()
+        self.ticks.clear()
+        self.queued.clear()
+        self.close_stream()
+
+    def __len__(self):
+        return sum(len(actions) for actions in self.events.values())
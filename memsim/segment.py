@@ -2,13 +2,19 @@ HOLE = "HOLE"
 PROGRAM = "PROGRAM"
 
 class Segment:
-    def __init__(self, stype:str, index:int, size:int):
+    def __init__(self, stype:str, index:int, size:int, used:int|None=None):
         self.type = stype
         self.index = index
+        # size is what the segment reserves in the layout, used is how much of
+        # it the program actually fills (they only differ for reservations)
         self.size = size
+        self.used = size if used is None else used
 
     def __repr__(self):
+        if self.type == PROGRAM and self.used != self.size:
+            return f"{self.type}, {self.index}, {self.used}/{self.size}"
+
         return f"{self.type}, {self.index}, {self.size}"
     
     def copy(self):
-        return Segment(self.type, self.index, self.size)
\ No newline at end of file
+        return Segment(self.type, self.index, self.size, self.used)
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import deque
+from .memsim import MEMSIM
+from .memory import MemoryStats
+from .segment import PROGRAM
+
+class MemoryView:
+    """
+    Heatmap of the address range [start, end) split in buckets, plus copies
+    of the segments inside the range (at most limit of them).
+    """
+
+    def __init__(self, start:int, end:int, buckets:int, limit:int):
+        self.start = start
+        self.end = end
+        self.buckets = buckets
+        self.limit = limit
+        self.occupancy = None
+        self.segments = list()
+        self.pids = list()
+
+    def capture(self, memory) -> "MemoryView":
+        view = MemoryView(self.start, self.end, self.buckets, self.limit)
+        view.occupancy = memory.get_occupancy(self.buckets, self.start, self.end)
+        view.segments = memory.get_segments_in_range(self.start, self.end, self.limit)
+        view.pids = [memory.get_program_id(segment) if segment.type == PROGRAM else None for segment in view.segments]
+        return view
+
+class SimulationSnapshot:
+    """
+    State published after a step. It is never mutated once published, so
+    readers on other threads can hold on to it without locking.
+    """
+
+    def __init__(self, tick:int, stats:MemoryStats, error:Exception|None=None, view:MemoryView|None=None):
+        self.tick = tick
+        self.stats = stats
+        self.error = error
+        self.view = view
+
+class SimulationWorker:
+    """
+    Runs MEMSIM.step on its own thread, one step every interval seconds while
+    running. Every step replaces latest with a new snapshot (a single reference
+    assignment), readers sample it at their own rate and simply never see the
+    snapshots replaced in between.
+    """
+
+    def __init__(self, memsim:MEMSIM, interval:float=1.0):
+        self.memsim = memsim
+        self.interval = interval
+        # requested heatmap, only computed while someone is looking at it
+        self.view:MemoryView|None = None
+        self._refresh = False
+        self.latest = SimulationSnapshot(memsim.dt, memsim.get_state().get_stats())
+
+        self._running = threading.Event()
+        self._wake = threading.Event()
+        self._step_requests = deque()
+        self._stopped = False
+        self._next_step = 0.0
+        self._thread = threading.Thread(target=self._run, name="memsim-worker", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def resume(self):
+        self._running.set()
+        self._wake.set()
+
+    def pause(self):
+        self._running.clear()
+
+    def is_running(self) -> bool:
+        return self._running.is_set()
+
+    def step_once(self):
+        self._step_requests.append(None)
+        self._wake.set()
+
+    def set_interval(self, interval:float):
+        self.interval = interval
+        self._next_step = min(self._next_step, time.perf_counter() + interval)
+        self._wake.set()
+
+    def set_view(self, view:MemoryView|None):
+        # publishes a fresh snapshot for the new view even while paused
+        self.view = view
+        self._refresh = True
+        self._wake.set()
+
+    def stop(self):
+        # waits for the step in progress, the simulation is only touched by
+        # the caller again once this returns
+        self._stopped = True
+        self._running.clear()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        # every wake up re-checks the flags, so a set() racing with clear()
+        # is never lost
+        while not self._stopped:
+            if self._refresh:
+                self._refresh = False
+                self._publish(self.latest.error)
+                continue
+
+            if self._step_requests:
+                self._step_requests.popleft()
+
+            elif self._running.is_set():
+                delay = self._next_step - time.perf_counter()
+                if delay > 0:
+                    self._wake.wait(delay)
+                    self._wake.clear()
+                    continue
+
+            else:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            self._step()
+
+    def _step(self):
+        self._next_step = time.perf_counter() + self.interval
+        error = None
+        try:
+            self.memsim.step()
+        except Exception as e:
+            # anything else (e.g. an out of order event stream) would end the
+            # thread silently, every error stops the run and is published
+            error = e
+            self._running.clear()
+
+        self._publish(error)
+
+    def _publish(self, error:Exception|None):
+        memory = self.memsim.get_state()
+        view = self.view.capture(memory) if self.view is not None else None
+        self.latest = SimulationSnapshot(self.memsim.dt, memory.get_stats(), error, view)
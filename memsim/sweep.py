@@ -0,0 +1,132 @@
+import argparse
+import copy
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import numpy as np
+from .headless import run_headless, failure_stats
+from .placement import FIRST_FIT, PLACEMENT_POLICIES
+from .eviction import EVICTION_POLICIES
+from .memory_errors import MemSimError
+
+GridPoint = Tuple[str, str|None, int, int]
+
+def _run_point(task:Tuple[Dict, str, str|None, int, int, int, int]) -> Tuple[GridPoint, Dict]:
+    # the run is returned with the grid point it was asked for, its stats
+    # may differ (e.g. the Disc grows under disc_growth)
+    base_config, placement, eviction, ram_size, disc_size, seed, ticks = task
+
+    config = copy.deepcopy(base_config)
+    config["setup"]["placement"] = placement
+    config["setup"]["eviction"] = eviction
+    config["setup"]["ram_size"] = ram_size
+    config["setup"]["disc_size"] = disc_size
+
+    try:
+        run = run_headless(config, ticks, auto_mode=True, seed=seed)
+    except MemSimError as e:
+        # MemSimErrors hold the memory and don't pickle, sending one back
+        # would break the whole pool instead of failing this run
+        run = failure_stats(config, True, seed, e)
+
+    return (placement, eviction, ram_size, disc_size), run
+
+def _started(runs:List[Dict], key:str) -> np.ndarray|None:
+    # values of the runs that got past setup, None when none did
+    values = np.array([run[key] for run in runs if run[key] is not None])
+    return values if len(values) else None
+
+def _aggregate(placement:str, eviction:str|None, ram_size:int, disc_size:int, runs:List[Dict]) -> Dict:
+    failures = [run for run in runs if run["error"] is not None]
+    fragmentation = _started(runs, "fragmentation")
+    compactions = _started(runs, "compactions")
+    swaps = _started(runs, "swaps")
+    final_disc_sizes = _started(runs, "final_disc_size")
+    ticks = np.array([run["ticks"] for run in runs])
+    started = fragmentation is not None
+
+    return {
+        "placement": placement,
+        "eviction": eviction,
+        "ram_size": ram_size,
+        "disc_size": disc_size,
+        "runs": len(runs),
+        "failure_rate": len(failures) / len(runs),
+        "mean_ticks_to_failure": float(np.mean([run["ticks"] for run in failures])) if failures else None,
+        "fragmentation_mean": float(fragmentation.mean()) if started else None,
+        "fragmentation_std": float(fragmentation.std()) if started else None,
+        "fragmentation_max": float(fragmentation.max()) if started else None,
+        "compactions_mean": float(compactions.mean()) if started else None,
+        "compactions_max": int(compactions.max()) if started else None,
+        "swaps_mean": float(swaps.mean()) if started else None,
+        "swaps_max": int(swaps.max()) if started else None,
+        "final_disc_size_mean": float(final_disc_sizes.mean()) if started else None,
+        "final_disc_size_max": int(final_disc_sizes.max()) if started else None,
+        "ticks_mean": float(ticks.mean()),
+        "ticks_per_second_mean": float(np.mean([run["ticks_per_second"] for run in runs])),
+    }
+
+def run_sweep(config_path:str, ram_sizes:List[int], disc_sizes:List[int], seeds:List[int], ticks:int,
+              workers:int|None=None, placements:List[str]|None=None, evictions:List[str]|None=None) -> Dict:
+    """
+    Runs one auto mode simulation per (placement, eviction, ram_size,
+    disc_size, seed) in a process pool and aggregates the runs of every grid
+    point into a single report.
+    """
+    with open(config_path, "r") as config_file:
+        base_config = json.load(config_file)
+
+    placements = placements or [base_config["setup"].get("placement", FIRST_FIT)]
+    evictions = evictions or [base_config["setup"].get("eviction")]
+    tasks = [
+        (base_config, placement, eviction, ram_size, disc_size, seed, ticks)
+        for placement in placements
+        for eviction in evictions
+        for ram_size in ram_sizes
+        for disc_size in disc_sizes
+        for seed in seeds
+    ]
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_run_point, tasks, chunksize=chunksize))
+
+    grid:Dict[GridPoint, List[Dict]] = dict()
+    for point, run in results:
+        grid.setdefault(point, list()).append(run)
+
+    return {
+        "config": config_path,
+        "ticks": ticks,
+        "seeds": list(seeds),
+        "workers": workers,
+        "grid": [_aggregate(*point, runs) for point, runs in grid.items()],
+    }
+
+def main(argv:List[str]|None=None):
+    parser = argparse.ArgumentParser(prog="python -m memsim.sweep", description="Runs seeded auto mode simulations over a ram_size/disc_size grid in parallel")
+    parser.add_argument("config", help="base configuration file, its setup sizes are overridden by the grid")
+    parser.add_argument("-r", "--ram", type=int, nargs="+", required=True, help="ram sizes of the grid")
+    parser.add_argument("-d", "--disc", type=int, nargs="+", required=True, help="disc sizes of the grid")
+    parser.add_argument("-p", "--placement", nargs="+", default=None, choices=list(PLACEMENT_POLICIES), help="placement policies of the grid (default: the config one)")
+    parser.add_argument("-e", "--eviction", nargs="+", default=None, choices=list(EVICTION_POLICIES), help="eviction policies of the grid (default: the config one)")
+    parser.add_argument("-n", "--seeds", type=int, default=16, help="number of seeds per grid point (default: 16)")
+    parser.add_argument("--first-seed", type=int, default=0, help="first seed of the range (default: 0)")
+    parser.add_argument("-t", "--ticks", type=int, default=1000, help="maximum ticks per simulation (default: 1000)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("-o", "--output", default=None, help="writes the report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    seeds = list(range(args.first_seed, args.first_seed + args.seeds))
+    report = run_sweep(args.config, args.ram, args.disc, seeds, args.ticks, args.workers, args.placement, args.eviction)
+
+    if args.output:
+        with open(args.output, "w") as report_file:
+            json.dump(report, report_file, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+if __name__ == "__main__":
+    main()
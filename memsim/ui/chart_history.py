@@ -0,0 +1,56 @@
+from typing import Tuple
+import numpy as np
+from numpy.typing import NDArray
+from memsim.ring_buffer import RingBuffer
+
+def downsample_min_max(x:NDArray, y:NDArray, points:int) -> Tuple[NDArray, NDArray]:
+    """
+    Keeps the minimum and the maximum of every bucket (in time order) plus the
+    first and last samples, so peaks and valleys survive however many samples
+    there are.
+    """
+    count = len(y)
+    buckets = max(points // 2, 1)
+    if count <= points or count < buckets * 2:
+        return x, y
+
+    # every sample lands in a bucket: the last extra buckets (the newest
+    # samples) are one sample wider than the others
+    width, extra = divmod(count, buckets)
+    indices = [[0, count - 1]]
+    start = 0
+    for bucket_width, bucket_count in ((width, buckets - extra), (width + 1, extra)):
+        if not bucket_count:
+            continue
+
+        block = y[start:start + bucket_width * bucket_count].reshape(bucket_count, bucket_width)
+        offsets = start + np.arange(bucket_count) * bucket_width
+        indices += [offsets + block.argmin(axis=1), offsets + block.argmax(axis=1)]
+        start += bucket_width * bucket_count
+
+    indices = np.unique(np.concatenate(indices))
+    return x[indices], y[indices]
+
+class ChartHistory:
+    """
+    Bounded (x, y) history of a line chart: the latest capacity samples live in
+    a preallocated RingBuffer and the plot gets at most points of them.
+    """
+
+    def __init__(self, capacity:int=4096, points:int=512):
+        self.samples = RingBuffer(capacity, np.float64, 2)
+        self.points = points
+
+    def append(self, x:float, y:float):
+        self.samples.append((x, y))
+
+    def series(self) -> Tuple[list, list]:
+        samples = self.samples.values()
+        x, y = downsample_min_max(samples[:, 0], samples[:, 1], self.points)
+        return x.tolist(), y.tolist()
+
+    def clear(self):
+        self.samples.clear()
+
+    def __len__(self):
+        return len(self.samples)
@@ -1,9 +1,14 @@
 from .theme import create_theme_imgui_light, create_stack_theme
+from .chart_history import ChartHistory
 from tkinter import Tk, filedialog
 import dearpygui.dearpygui as dpg
 import time
+from collections import deque
+from typing import Tuple
 from memsim.memsim import MEMSIM, PROGRAM
 from memsim.memory_errors import MemSimError
+from memsim.memory import MemoryStats
+from memsim.simulation_worker import SimulationWorker, MemoryView
 
 def get_left_width():
     viewport_width = dpg.get_viewport_width()
@@ -13,7 +18,17 @@ def get_mem_usage_space():
     viewport_width = dpg.get_viewport_height()
     return int(viewport_width * 0.50)
 
+# heatmap buckets (rows x columns) and the most segments listed under it
+MAP_ROWS = 16
+MAP_COLUMNS = 64
+MAP_SEGMENT_LIMIT = 64
+
 class MEMSIMUI:
+    def __init__(self, chart_capacity:int=4096, chart_points:int=512):
+        # the memory usage chart keeps the latest chart_capacity samples and
+        # plots at most chart_points of them
+        self.memory_usage = ChartHistory(chart_capacity, chart_points)
+
     def __enter__(self):
         dpg.create_context()
 
@@ -29,7 +44,12 @@ class MEMSIMUI:
         self.step_speed = 1
         self.mem_state = None
         self.memsim = None
-        self.advance_sim = False
+        self.worker = None
+        self.shown_snapshot = None
+        self.shown_error = None
+        self.map_active = False
+        self.layout_changes = deque()
+        self.mem_rows = list()
 
         self.chart_window = None
         self.layout_window = None
@@ -77,10 +97,7 @@ class MEMSIMUI:
                             x_axis = dpg.add_plot_axis(dpg.mvXAxis, label="Tempo (segundos)", tag="uso_memoria_x_axis")
                             y_axis = dpg.add_plot_axis(dpg.mvYAxis, label="Bytes", tag="uso_memoria_y_axis")
 
-                            self.memory_usage_x = []
-                            self.memory_usage_y = []
-
-                            self.chart_mem_usage = dpg.add_line_series(x=self.memory_usage_x, y=self.memory_usage_y,
+                            self.chart_mem_usage = dpg.add_line_series(x=[], y=[],
                                                                        label="Uso de Memória", parent=y_axis)
 
                         with dpg.plot(label="Buracos vs. Programas", height=-1) as holes_programs:
@@ -106,15 +123,43 @@ class MEMSIMUI:
 
                 with dpg.group():
                     dpg.add_text("Layout da Memória")
-                    with dpg.child_window() as layout_window:
-                        self.layout_window = layout_window
-
-                        with dpg.table(header_row=False, resizable=True, policy=dpg.mvTable_SizingStretchProp, height=-1,
-                                        borders_outerH=True, borders_innerV=True, borders_innerH=True, borders_outerV=True) as table:
-                            self.mem_stack = table
-                        
-                            dpg.bind_item_theme(table, self.stack_theme)
-                            dpg.add_table_column()
+                    with dpg.tab_bar(callback=self.layout_tab_callback):
+                        with dpg.tab(label="Tabela"):
+                            with dpg.child_window() as layout_window:
+                                self.layout_window = layout_window
+
+                                with dpg.table(header_row=False, resizable=True, policy=dpg.mvTable_SizingStretchProp, height=-1,
+                                                borders_outerH=True, borders_innerV=True, borders_innerH=True, borders_outerV=True) as table:
+                                    self.mem_stack = table
+                                
+                                    dpg.bind_item_theme(table, self.stack_theme)
+                                    dpg.add_table_column()
+
+                        # heatmap of the address space, for RAMs too big for the table
+                        with dpg.tab(label="Mapa") as map_tab:
+                            self.map_tab = map_tab
+
+                            with dpg.child_window() as map_window:
+                                self.map_window = map_window
+
+                                with dpg.group(horizontal=True):
+                                    self.map_start = dpg.add_input_int(label="Início", default_value=0, min_value=0, min_clamped=True, width=90)
+                                    self.map_end = dpg.add_input_int(label="Fim", default_value=0, min_value=0, min_clamped=True, width=90)
+                                    dpg.add_button(label="Zoom", callback=self.map_zoom_callback)
+                                    dpg.add_button(label="Tudo", callback=self.map_reset_callback)
+
+                                with dpg.plot(label="Ocupação", height=300, width=-1, no_mouse_pos=True):
+                                    dpg.add_plot_axis(dpg.mvXAxis, no_tick_labels=True)
+                                    with dpg.plot_axis(dpg.mvYAxis, no_tick_labels=True):
+                                        self.map_series = dpg.add_heat_series([0.0] * MAP_ROWS * MAP_COLUMNS, MAP_ROWS, MAP_COLUMNS,
+                                                                              scale_min=0.0, scale_max=1.0, format="")
+
+                                self.map_info = dpg.add_text("")
+
+                                with dpg.table(header_row=False, policy=dpg.mvTable_SizingStretchProp,
+                                                borders_outerH=True, borders_innerH=True) as map_table:
+                                    self.map_table = map_table
+                                    dpg.add_table_column()
 
         # -------------- HANDLERS DE TECLADO -----------------
 
@@ -163,6 +208,29 @@ class MEMSIMUI:
 
     # ============================================================
 
+    def _segment_label(self, segment, pid:int|None) -> str:
+        if segment.type == PROGRAM:
+            size = segment.size if segment.used == segment.size else f"{segment.used}/{segment.size}"
+            return f"ID: {pid}\nIndex: {segment.index}\nSize: {size}"
+
+        return f"{segment.type}\nIndex: {segment.index}\nSize: {segment.size}"
+
+    def _add_mem_row(self, segment, pid:int|None, before:int=0) -> Tuple[int, int]:
+        with dpg.table_row(parent=self.mem_stack, before=before) as row:
+            button = dpg.add_button(label=self._segment_label(segment, pid), height=max(segment.size, 45))
+
+        return row, button
+
+    def attach_mem_state(self):
+        # the table is built once, then only patched from the layout changes
+        self.layout_changes = deque()
+        self.mem_state.add_layout_listener(self.layout_changes.append)
+        if self.memsim.profiler is not None:
+            self.memsim.profiler.wrap(self, "rebuild_mem_stack", "UI.rebuild_mem_stack")
+            self.memsim.profiler.wrap(self, "patch_mem_stack", "UI.patch_mem_stack")
+
+        self.rebuild_mem_stack()
+
     def rebuild_mem_stack(self):
         if dpg.does_item_exist(self.mem_stack):
             dpg.delete_item(self.mem_stack, children_only=False)
@@ -174,92 +242,168 @@ class MEMSIMUI:
             dpg.bind_item_theme(table, self.stack_theme)
             dpg.add_table_column()
 
-            for segment in self.mem_state.get_memory_layout():
-                with dpg.table_row():
-                    height = segment.size
-                    if height < 45:
-                        height = 45
+        self.mem_rows = list()
+        for segment in self.mem_state.get_memory_layout():
+            pid = self.mem_state.get_program_id(segment) if segment.type == PROGRAM else None
+            self.mem_rows.append(self._add_mem_row(segment, pid))
+
+        self.layout_changes.clear()
 
-                    if segment.type == PROGRAM:
-                        pid = str(self.mem_state.get_program_id(segment))
-                        dpg.add_button(label=f"ID: {pid}\nIndex: {segment.index}\nSize: {segment.size}", height=height)
+    def patch_mem_stack(self):
+        # applies the queued splices, existing rows are relabelled and only
+        # the difference between removed and inserted rows is created/deleted
+        while self.layout_changes:
+            change = self.layout_changes.popleft()
+            end = change.position + change.removed
+            rows = self.mem_rows[change.position:end]
+            before = self.mem_rows[end][0] if end < len(self.mem_rows) else 0
 
-                    else:
-                        dpg.add_button(label=f"{segment.type}\nIndex: {segment.index}\nSize: {segment.size}", height=height)
+            new_rows = list()
+            for offset, (segment, pid) in enumerate(zip(change.segments, change.pids)):
+                if offset < len(rows):
+                    dpg.configure_item(rows[offset][1], label=self._segment_label(segment, pid), height=max(segment.size, 45))
+                    new_rows.append(rows[offset])
+                else:
+                    new_rows.append(self._add_mem_row(segment, pid, before))
+
+            for row, _ in rows[len(change.segments):]:
+                dpg.delete_item(row)
+
+            self.mem_rows[change.position:end] = new_rows
 
     def advance_sim_callback(self):
         if self.memsim is None:
+            # only shows the missing configuration warning
             self.start_sim()
-            self.is_sim_running = False
-            self.elapsed_time = -1
-            
-        self.advance_sim = True      
-        self.elapsed_time += 1
+            return
 
-    def update_hole_programs(self):
-        total_mem = self.mem_state.memory_size
-        self.unallocated_mem = int(self.mem_state.get_total_unallocated_memory() / total_mem * 100)
-        self.allocated_mem = int(self.mem_state.get_total_allocated_memory() / total_mem * 100)
+        self.worker.step_once()
+
+    def update_hole_programs(self, stats:MemoryStats):
+        self.unallocated_mem = int(stats.unallocated / stats.memory_size * 100)
+        self.allocated_mem = int(stats.allocated / stats.memory_size * 100)
         dpg.set_value(self.chart_hole_programs, [[self.allocated_mem, self.unallocated_mem], []])
 
-    def update_memory_usage(self):
-        self.memory_usage_y.append(self.mem_state.get_total_allocated_memory())
-        self.memory_usage_x.append(self.elapsed_time)
-        dpg.set_value(self.chart_mem_usage, [list(self.memory_usage_x), list(self.memory_usage_y)])
+    def update_memory_usage(self, stats:MemoryStats):
+        self.memory_usage.append(self.elapsed_time, stats.allocated)
+        dpg.set_value(self.chart_mem_usage, list(self.memory_usage.series()))
         dpg.fit_axis_data('uso_memoria_x_axis')
         dpg.fit_axis_data('uso_memoria_y_axis')
-        dpg.set_axis_limits("uso_memoria_y_axis", 0, self.mem_state.memory_size)
+        dpg.set_axis_limits("uso_memoria_y_axis", 0, stats.memory_size)
 
     def update_simulation(self):
-        self.memsim.step()
-        self.mem_state = self.memsim.get_state()
+        # samples the latest published state, the ones replaced in between
+        # frames are dropped; layout changes are queued so none is lost
+        snapshot = self.worker.latest
+        if snapshot is self.shown_snapshot:
+            return
 
-        self.update_memory_usage()
-        self.update_hole_programs()
-        self.rebuild_mem_stack()
+        self.shown_snapshot = snapshot
+        self.update_memory_usage(snapshot.stats)
+        self.update_hole_programs(snapshot.stats)
+        self.patch_mem_stack()
+        if snapshot.view is not None:
+            self.update_memory_map(snapshot.view)
+
+        if snapshot.error is not None and snapshot.error is not self.shown_error:
+            self.shown_error = snapshot.error
+            self.is_sim_running = False
+            self.show_memory_error(snapshot.error)
+
+    def update_memory_map(self, view:MemoryView):
+        dpg.set_value(self.map_series, [view.occupancy.tolist()])
+
+        shown = f" (primeiros {len(view.segments)})" if len(view.segments) == view.limit else ""
+        dpg.set_value(self.map_info, f"Endereços {view.start} a {view.end - 1}, segmentos{shown}:")
+
+        # only the segments of the zoomed range exist as rows
+        dpg.delete_item(self.map_table, children_only=True, slot=1)
+        for segment, pid in zip(view.segments, view.pids):
+            with dpg.table_row(parent=self.map_table):
+                dpg.add_text(self._segment_label(segment, pid).replace("\n", "  "))
+
+    def _map_view(self) -> MemoryView:
+        memory_size = self.mem_state.memory_size
+        start = min(dpg.get_value(self.map_start), memory_size - 1)
+        end = dpg.get_value(self.map_end)
+        end = memory_size if end <= start else min(end, memory_size)
+        return MemoryView(start, end, MAP_ROWS * MAP_COLUMNS, MAP_SEGMENT_LIMIT)
+
+    def layout_tab_callback(self, sender, app_data, user_data):
+        # the heatmap is only computed while its tab is open
+        self.map_active = app_data == self.map_tab
+        if self.worker is not None:
+            self.worker.set_view(self._map_view() if self.map_active else None)
+
+    def map_zoom_callback(self, sender, app_data, user_data):
+        if self.worker is not None and self.map_active:
+            self.worker.set_view(self._map_view())
+
+    def map_reset_callback(self, sender, app_data, user_data):
+        if self.mem_state is None:
+            return
+
+        dpg.set_value(self.map_start, 0)
+        dpg.set_value(self.map_end, self.mem_state.memory_size)
+        self.map_zoom_callback(sender, app_data, user_data)
+
+    def show_memory_error(self, error:Exception):
+        with dpg.window(
+                label="Erro de Memória" if isinstance(error, MemSimError) else "Erro na Simulação", modal=True,
+                no_resize=True, no_move=True, 
+                show=False, height=-1, no_close=False) as modal:
+            dpg.add_text(f"{str(error)}")
+            dpg.add_button(label="Fechar", callback=self.stop_sim_abruptly, user_data={"modal":modal})
+
+        dpg.configure_item(
+            modal,
+            show=True,
+            pos=(dpg.get_viewport_width()/2 - 150,
+                dpg.get_viewport_height()/2 - 75)
+        )
+
+    def start_worker(self):
+        # the simulation only runs on the worker thread from here on
+        self.worker = SimulationWorker(self.memsim, self.step_speed)
+        self.shown_snapshot = None
+        self.shown_error = None
+
+        dpg.set_value(self.map_start, 0)
+        dpg.set_value(self.map_end, self.mem_state.memory_size)
+        if self.map_active:
+            self.worker.set_view(self._map_view())
+
+        self.worker.start()
+
+    def stop_worker(self):
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
 
     def stop_sim_abruptly(self, sender, app_data, user_data):
         dpg.configure_item(user_data["modal"], show=False)
         self.stop_sim()
 
     def run_simulation(self):
-        last_time = time.perf_counter()
-        self.start_time = last_time   # store when the simulation started
+        self.start_time = time.perf_counter()   # store when the simulation started
         self.elapsed_time = 0.0     # running total
 
+        # the ticks run on the worker thread, every frame only shows the
+        # latest state it published
         while dpg.is_dearpygui_running():
-            if self.is_sim_running or self.advance_sim:
-                now = time.perf_counter()
-                self.elapsed_time = now - self.start_time  # total time passed since start
-
-                if now - last_time >= self.step_speed:
-                    try:
-                        self.update_simulation()
-                    except MemSimError as e:
-                        with dpg.window(
-                                label="Erro de Memória", modal=True,
-                                no_resize=True, no_move=True, 
-                                show=False, height=-1, no_close=False) as modal:
-                            dpg.add_text(f"{str(e)}")
-                            dpg.add_button(label="Fechar", callback=self.stop_sim_abruptly, user_data={"modal":modal})
-
-                        dpg.configure_item(
-                            modal,
-                            show=True,
-                            pos=(dpg.get_viewport_width()/2 - 150,
-                                dpg.get_viewport_height()/2 - 75)
-                        )
-
-                    last_time = now
-
-                self.advance_sim = False 
+            if self.worker is not None:
+                self.elapsed_time = time.perf_counter() - self.start_time  # total time passed since start
+                self.update_simulation()
 
             dpg.render_dearpygui_frame()
 
     def step_speed_callback(self, sender, app_data, user_data):
         self.step_speed = user_data["step_speed"]
+        if self.worker is not None:
+            self.worker.set_interval(self.step_speed)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop_worker()
         dpg.destroy_context()
 
     def on_viewport_resize(self):
@@ -268,11 +412,14 @@ class MEMSIMUI:
         dpg.configure_item(self.holes_programs, width=get_mem_usage_space() * 0.85)
 
     def load_init_script(self, file_path):
+        self.stop_worker()
         if self.memsim:
             self.memsim.stop_simulation()
 
         self.memsim = MEMSIM(file_path, auto_mode=False)
         self.mem_state = self.memsim.get_state()
+        self.attach_mem_state()
+        self.start_worker()
     
     def search_init_file(self):
         root = Tk()
@@ -280,7 +427,7 @@ class MEMSIMUI:
 
         file_path = filedialog.askopenfilename(
             title="Select a file",
-            filetypes=(("All files", "*.json"), ("Text files", "*.txt"))
+            filetypes=(("All files", "*.json"), ("Event streams", "*.jsonl *.ndjson"), ("Text files", "*.txt"))
         )
 
         root.destroy()
@@ -293,12 +440,14 @@ class MEMSIMUI:
         self.load_init_script(file_path)
 
     def load_init_auto(self, file_path):
+        self.stop_worker()
         if self.memsim:
             self.memsim.stop_simulation()
-            self.update_simulation()
 
         self.memsim = MEMSIM(file_path, auto_mode=True)
         self.mem_state = self.memsim.get_state()
+        self.attach_mem_state()
+        self.start_worker()
 
     def load_init_auto_callback(self, sender, app_data, user_data):
         file_path = self.search_init_file()
@@ -307,6 +456,7 @@ class MEMSIMUI:
     def start_sim(self):
         if self.memsim:
             self.is_sim_running = True
+            self.worker.resume()
         else:
             with dpg.window(label="Aviso", modal=True, no_resize=True, no_move=True, show=False, height=-1) as modal:
                 dpg.add_text("Selecione um arquivo de configuração primeiro")
@@ -319,7 +469,9 @@ class MEMSIMUI:
                 )
     
     def stop_sim(self):
+        self.stop_worker()
         self.is_sim_running = False
+        self.memory_usage.clear()
         dpg.set_value(self.chart_mem_usage, [[0], [0]])
         dpg.fit_axis_data('uso_memoria_x_axis')
         dpg.fit_axis_data('uso_memoria_y_axis')
@@ -329,6 +481,8 @@ class MEMSIMUI:
             
     def pause_sim(self):
         self.is_sim_running = False
+        if self.worker is not None:
+            self.worker.pause()
 
     def start_sim_callback(self, sender, app_data, user_data):
         self.start_sim()